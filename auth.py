@@ -0,0 +1,29 @@
+# auth.py
+
+from functools import wraps
+
+from flask import flash, redirect, url_for
+from flask_login import current_user, login_required
+
+from extensions import login_manager
+from identity import identity_cache
+
+
+# Define user loader for Flask-Login
+@login_manager.user_loader
+def load_user(user_id):
+    return identity_cache.load(int(user_id))
+
+
+def role_required(role):
+    """Decorator to restrict access based on user role."""
+    def decorator(f):
+        @wraps(f)
+        @login_required  # Ensure the user is logged in
+        def decorated_function(*args, **kwargs):
+            if current_user.role != role:
+                flash('Access denied.', 'danger')
+                return redirect(url_for('public.index'))
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -0,0 +1,279 @@
+# benchmarks/routes.py
+"""Latency, queries per request and peak memory of the key routes, run through the Flask test client.
+
+    python benchmarks/seed.py --database sqlite:////tmp/tusome-bench.db --scale medium
+    python benchmarks/routes.py --database sqlite:////tmp/tusome-bench.db --output before.json
+    python benchmarks/routes.py --database sqlite:////tmp/tusome-bench.db --compare before.json
+
+SQLite databases are copied first, so that runs do not change the seeded data.
+With --compare, the run fails if a route's p95 grows by more than --threshold
+percent or it issues more queries per request than in the baseline.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, namedtuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import Enrollment, Question, Quiz, QuizResult, QuizSubmission, RoleEnum, User  # noqa: E402
+
+# prepare(ctx) runs once per route; request(client, ctx, i) does the untimed setup of the
+# i-th request, e.g. switching users, and returns a callable that issues it
+Route = namedtuple('Route', ['name', 'prepare', 'request', 'max_requests'])
+
+
+def login_as(client, user_id):
+    """Sign the test client in without a password check, as Flask-Login would after a login."""
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+def _prepare_student(ctx):
+    # The quiz of the course with the most enrollments, and its students who have not taken it yet
+    row = db.session.execute(
+        db.select(Quiz.id, Quiz.course_id)
+        .join(Enrollment, Enrollment.course_id == Quiz.course_id)
+        .group_by(Quiz.id)
+        .order_by(db.func.count(Enrollment.id).desc())
+        .limit(1)
+    ).first()
+    if row is None:
+        raise SystemExit('The database has no quizzes with enrolled students; run benchmarks/seed.py first.')
+    ctx['quiz_id'], ctx['course_id'] = row
+    taken = db.select(QuizSubmission.student_id).where(QuizSubmission.quiz_id == ctx['quiz_id'])
+    ctx['fresh_students'] = list(db.session.execute(
+        db.select(Enrollment.student_id)
+        .where(Enrollment.course_id == ctx['course_id'], Enrollment.student_id.not_in(taken))
+        .order_by(Enrollment.student_id)
+    ).scalars())
+    if not ctx['fresh_students']:
+        raise SystemExit('Every student of the busiest quiz has taken it; seed with a lower --take-rate.')
+    ctx['student_id'] = ctx['fresh_students'][0]
+    questions = db.session.execute(db.select(db.func.count(Question.id)).where(Question.quiz_id == ctx['quiz_id'])).scalar()
+    ctx['answers'] = {f'questions-{n}-answer': '1' for n in range(questions)}
+
+
+def _prepare_login(ctx):
+    ctx['usernames'] = list(db.session.execute(
+        db.select(User.username).where(User.role == RoleEnum.STUDENT).order_by(User.id).limit(1000)
+    ).scalars())
+
+
+def _prepare_instructor(ctx):
+    # The quiz with the most results, and the instructor of its course
+    quiz_id = db.session.execute(
+        db.select(QuizResult.quiz_id).group_by(QuizResult.quiz_id).order_by(db.func.count().desc()).limit(1)
+    ).scalar()
+    if quiz_id is None:
+        raise SystemExit('The database has no quiz results; run benchmarks/seed.py first.')
+    quiz = db.session.get(Quiz, quiz_id)
+    ctx['quiz_id'], ctx['course_id'], ctx['instructor_id'] = quiz.id, quiz.course_id, quiz.course.instructor_id
+
+
+def _get_as(user_key, path):
+    def request(client, ctx, i):
+        if i == 0:
+            login_as(client, ctx[user_key])
+        return lambda: client.get(path.format(**ctx))
+    return request
+
+
+def _login(client, ctx, i):
+    client.delete_cookie('session')
+    username = ctx['usernames'][i % len(ctx['usernames'])]
+    return lambda: client.post('/login', data={'username': username, 'password': ctx['password']})
+
+
+def _submit_quiz(client, ctx, i):
+    # Each submission comes from a student who has not taken the quiz; re-submissions once they run out
+    login_as(client, ctx['fresh_students'][i % len(ctx['fresh_students'])])
+    return lambda: client.post(f"/course/{ctx['course_id']}/quiz/{ctx['quiz_id']}/submit", data=ctx['answers'])
+
+
+ROUTES = [
+    Route('login', _prepare_login, _login, 50),  # Dominated by the password hash
+    Route('browse_courses', _prepare_student, _get_as('student_id', '/browse_courses'), None),
+    Route('course_details', _prepare_student, _get_as('student_id', '/course/{course_id}'), None),
+    Route('api_courses', _prepare_student, _get_as('student_id', '/api/v1/courses'), None),
+    Route('api_course_lessons', _prepare_student, _get_as('student_id', '/api/v1/courses/{course_id}/lessons?fields=id,title,slug'), None),
+    Route('take_quiz', _prepare_student, _get_as('student_id', '/course/{course_id}/quiz/{quiz_id}'), None),
+    Route('submit_quiz', _prepare_student, _submit_quiz, None),
+    Route('manage_students', _prepare_instructor, _get_as('instructor_id', '/instructor/manage_students?course_id={course_id}'), None),
+    Route('view_submissions', _prepare_instructor, _get_as('instructor_id', '/instructor/view_submissions/{course_id}/{quiz_id}'), None),
+    Route('export_quiz_answers', _prepare_instructor, _get_as('instructor_id', '/instructor/gradebook/{course_id}/quiz/{quiz_id}.csv'), 20),
+]
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    return samples[max(0, math.ceil(fraction * len(samples)) - 1)]
+
+
+class QueryCounter:
+    def __init__(self, engines):
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def run_route(app, route, requests, warmup, memory_requests, ctx, queries):
+    """Time one route; returns its result entry."""
+    with app.app_context():
+        route.prepare(ctx)
+    n = min(requests, route.max_requests or requests)
+    client = app.test_client()
+    statuses = Counter()
+    latencies = []
+    query_counts = []
+    for i in range(warmup + n):
+        issue = route.request(client, ctx, i)
+        queries.count = 0
+        started = time.perf_counter()
+        response = issue()
+        elapsed = time.perf_counter() - started
+        response.close()
+        if i >= warmup:
+            latencies.append(elapsed * 1000)
+            query_counts.append(queries.count)
+            statuses[response.status_code] += 1
+
+    # Peak Python memory of a few more requests, measured apart since tracing slows them down
+    peak = 0
+    tracemalloc.start()
+    for i in range(warmup + n, warmup + n + memory_requests):
+        issue = route.request(client, ctx, i)
+        tracemalloc.reset_peak()
+        issue().close()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'requests': n,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'mean_ms': round(sum(latencies) / n, 2),
+        'queries_per_request': round(sum(query_counts) / n, 2),
+        'max_queries': max(query_counts),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def compare(baseline, current, threshold):
+    """Return the regressions of current against baseline, as printable lines."""
+    regressions = []
+    for name, result in current['routes'].items():
+        before = baseline.get('routes', {}).get(name)
+        if before is None:
+            continue
+        change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+        print(f"{name:18} p95 {before['p95_ms']:8.2f} -> {result['p95_ms']:8.2f} ms ({change:+.0f}%)  "
+              f"queries {before['queries_per_request']:.1f} -> {result['queries_per_request']:.1f}", file=sys.stderr)
+        if change > threshold:
+            regressions.append(f'{name}: p95 {change:+.0f}%')
+        if result['queries_per_request'] > before['queries_per_request']:
+            regressions.append(f"{name}: {result['queries_per_request']} queries per request, was {before['queries_per_request']}")
+    return regressions
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default=os.environ.get('DATABASE_URL'), help='Seeded database URL.')
+    parser.add_argument('--routes', nargs='+', choices=[route.name for route in ROUTES], help='Default: all.')
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per route.')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--memory-requests', type=int, default=5, help='Requests traced for peak memory.')
+    parser.add_argument('--password', default='password123', help='Password of the seeded users.')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the fragment cache.')
+    parser.add_argument('--in-place', action='store_true', help='Run against the database itself, not a copy.')
+    parser.add_argument('--output', help='Write the JSON results here instead of stdout.')
+    parser.add_argument('--compare', help='Baseline JSON results to compare with.')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Allowed p95 growth in percent.')
+    args = parser.parse_args(argv)
+    if not args.database:
+        parser.error('--database or DATABASE_URL is required')
+
+    url = make_url(args.database)
+    workdir = tempfile.mkdtemp()
+    if url.get_backend_name() == 'sqlite' and url.database and not args.in_place:
+        copy = os.path.join(workdir, 'bench.db')
+        shutil.copyfile(url.database, copy)
+        url = url.set(database=copy)
+
+    overrides = {
+        'SQLALCHEMY_DATABASE_URI': url.render_as_string(hide_password=False),
+        'WTF_CSRF_ENABLED': False,
+        'CACHE_SQLITE_PATH': os.path.join(workdir, 'fragment_cache.db'),
+    }
+    if args.no_cache:
+        overrides['CACHE_BACKEND'] = None
+    app = create_app(overrides)
+    with app.app_context():
+        queries = QueryCounter(db.engines.values())
+
+    results = {}
+    for route in ROUTES:
+        if args.routes and route.name not in args.routes:
+            continue
+        print(f'{route.name}...', file=sys.stderr)
+        ctx = {'password': args.password}
+        results[route.name] = run_route(app, route, args.requests, args.warmup, args.memory_requests, ctx, queries)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'commit': _commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'database': make_url(args.database).render_as_string(hide_password=True),
+        'cache': not args.no_cache,
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'routes': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as out:
+            out.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as source:
+            regressions = compare(json.load(source), report, args.threshold)
+        for line in regressions:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
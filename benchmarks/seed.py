@@ -0,0 +1,254 @@
+# benchmarks/seed.py
+"""Fill a database with synthetic users, courses, enrollments and quiz answers at production scale.
+
+    python benchmarks/seed.py --database sqlite:////tmp/tusome-bench.db --scale large
+
+Rows go through the existing models as bulk inserts, with explicit ids so that
+nothing is read back. Every generated user has the password given by --password.
+Course popularity is skewed, so a few courses have most of the enrollments.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from app import create_app  # noqa: E402
+from counters import reconcile_counters  # noqa: E402
+from extensions import db  # noqa: E402
+from lessons import lesson_hash, render_markdown  # noqa: E402
+from migrate import upgrade  # noqa: E402
+from models import (  # noqa: E402
+    Course, Enrollment, Instructor, Lesson, LessonCompletion, Notice, Question, Quiz, QuizResult, QuizSubmission,
+    RoleEnum, Student, User
+)
+from roster import PASSWORD_HASH_METHOD  # noqa: E402
+from notices import reconcile_unread  # noqa: E402
+from progress import reconcile_progress  # noqa: E402
+from search import create_search_tables, rebuild_search_index  # noqa: E402
+
+Scale = namedtuple('Scale', [
+    'instructors', 'courses', 'students', 'enrollments_per_student', 'lessons_per_course',
+    'quizzes_per_course', 'questions_per_quiz', 'take_rate', 'notices'
+])
+
+# large: about 1.5M enrollments and 4.5M quiz answers
+SCALES = {
+    'small': Scale(20, 100, 2_000, 4, 3, 2, 10, 0.5, 50),
+    'medium': Scale(500, 2_000, 25_000, 5, 5, 2, 10, 0.4, 500),
+    'large': Scale(2_000, 5_000, 250_000, 6, 5, 3, 10, 0.1, 2_000),
+}
+
+SUBJECTS = ['Algebra', 'Biology', 'Chemistry', 'History', 'Literature', 'Physics', 'Economics',
+            'Geography', 'Programming', 'Statistics', 'Kiswahili', 'Music', 'Accounting', 'Design']
+LEVELS = ['Introduction to', 'Foundations of', 'Intermediate', 'Advanced', 'Applied', 'Topics in']
+
+LESSON_TEMPLATES = [
+    '## Overview\n\nThis lesson covers the *key ideas* of the unit.\n\n- Read the notes\n- Try the exercises\n- Ask questions',
+    'Start with the worked example below.\n\n```\nstep 1: identify the inputs\nstep 2: apply the rule\n```\n\nThen attempt **all** practice problems.',
+    '### Reading\n\nChapter summary with a [reference](https://example.org/reading).\n\n1. First point\n2. Second point\n3. Third point',
+]
+
+SINCE = datetime(2024, 1, 1)
+
+
+def _when(rng):
+    return SINCE + timedelta(seconds=rng.randrange(300 * 24 * 60 * 60))
+
+
+def _next_id(model):
+    return (db.session.execute(db.select(db.func.max(model.id))).scalar() or 0) + 1
+
+
+class BulkWriter:
+    """Buffers rows per model and inserts them in chunks, one transaction per flush."""
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.buffers = {}
+        self.counts = {}
+
+    def add(self, model, row):
+        buffer = self.buffers.setdefault(model, [])
+        buffer.append(row)
+        if len(buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        # Parents first, so that foreign keys are satisfied on databases that check them
+        for model, rows in self.buffers.items():
+            if rows:
+                db.session.execute(db.insert(model), rows)
+                self.counts[model.__tablename__] = self.counts.get(model.__tablename__, 0) + len(rows)
+                rows.clear()
+        db.session.commit()
+
+
+def seed(scale, password='password123', chunk_size=5000, rng=None):
+    """Insert the rows of a scale into the database of the current app; returns the row counts."""
+    rng = rng or random.Random(42)
+    writer = BulkWriter(chunk_size)
+    hashed_password = generate_password_hash(password, method=PASSWORD_HASH_METHOD)  # Shared; hashing each would take hours
+
+    # Users: instructors first, then students
+    user_id = _next_id(User)
+    instructor_ids = list(range(user_id, user_id + scale.instructors))
+    student_ids = list(range(user_id + scale.instructors, user_id + scale.instructors + scale.students))
+    for instructor_id in instructor_ids:
+        writer.add(User, {'id': instructor_id, 'username': f'instructor{instructor_id}', 'password': hashed_password, 'role': RoleEnum.INSTRUCTOR})
+        writer.add(Instructor, {'id': instructor_id})
+    for student_id in student_ids:
+        writer.add(User, {'id': student_id, 'username': f'student{student_id}', 'password': hashed_password, 'role': RoleEnum.STUDENT})
+        writer.add(Student, {'id': student_id})
+    writer.flush()
+
+    # Courses, with their lessons, quizzes and questions
+    course_id, lesson_id, quiz_id, question_id = _next_id(Course), _next_id(Lesson), _next_id(Quiz), _next_id(Question)
+    rendered = [render_markdown(template) for template in LESSON_TEMPLATES]
+    course_ids = []
+    course_owner = {}  # course id -> instructor id
+    course_lessons = {}  # course id -> [lesson id, ...]
+    course_quizzes = {}  # course id -> [(quiz id, [(question id, correct answer), ...]), ...]
+    for n in range(scale.courses):
+        title = f'{rng.choice(LEVELS)} {rng.choice(SUBJECTS)} {n + 1}'
+        writer.add(Course, {
+            'id': course_id,
+            'title': title,
+            'description': f'{title} covers the core syllabus with weekly lessons, quizzes and assignments.',
+            'is_featured': rng.random() < 0.02,
+            'instructor_id': course_owner.setdefault(course_id, rng.choice(instructor_ids)),
+        })
+        lessons = course_lessons[course_id] = []
+        for position in range(scale.lessons_per_course):
+            lesson_title = f'{title}: Lesson {position + 1}'
+            template = lesson_id % len(LESSON_TEMPLATES)
+            writer.add(Lesson, {
+                'id': lesson_id,
+                'title': lesson_title,
+                'content': LESSON_TEMPLATES[template],
+                'content_html': rendered[template],
+                'content_hash': lesson_hash(lesson_title, LESSON_TEMPLATES[template]),
+                'slug': f'lesson-{lesson_id}',
+                'course_id': course_id,
+            })
+            lessons.append(lesson_id)
+            lesson_id += 1
+        quizzes = course_quizzes[course_id] = []
+        for position in range(scale.quizzes_per_course):
+            writer.add(Quiz, {'id': quiz_id, 'course_id': course_id, 'title': f'Quiz {position + 1}', 'status': 'Active'})
+            questions = []
+            for _ in range(scale.questions_per_quiz):
+                a, b = rng.randrange(100), rng.randrange(100)
+                writer.add(Question, {'id': question_id, 'quiz_id': quiz_id, 'question_text': f'What is {a} + {b}?', 'correct_answer': str(a + b)})
+                questions.append((question_id, str(a + b)))
+                question_id += 1
+            quizzes.append((quiz_id, questions))
+            quiz_id += 1
+        course_ids.append(course_id)
+        course_id += 1
+    writer.flush()
+
+    # Enrollments with a Zipf-like popularity, and the answers to the quizzes each student took
+    ranks = list(range(len(course_ids)))
+    rng.shuffle(ranks)
+    cum_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in ranks))
+    enrollment_id, submission_id, result_id = _next_id(Enrollment), _next_id(QuizSubmission), _next_id(QuizResult)
+    completion_id = _next_id(LessonCompletion)
+    for student_id in student_ids:
+        count = rng.randint(1, 2 * scale.enrollments_per_student - 1)
+        for course in set(rng.choices(course_ids, cum_weights=cum_weights, k=count)):
+            writer.add(Enrollment, {'id': enrollment_id, 'student_id': student_id, 'course_id': course})
+            enrollment_id += 1
+            # Students work through a course's lessons in order
+            for lesson in course_lessons[course][:rng.randint(0, len(course_lessons[course]))]:
+                writer.add(LessonCompletion, {
+                    'id': completion_id, 'student_id': student_id, 'lesson_id': lesson, 'course_id': course, 'completed_at': _when(rng),
+                })
+                completion_id += 1
+            for quiz, questions in course_quizzes[course]:
+                if rng.random() >= scale.take_rate:
+                    continue
+                submitted_at = _when(rng)
+                score = 0
+                for question, correct in questions:
+                    right = rng.random() < 0.7
+                    score += right
+                    writer.add(QuizSubmission, {
+                        'id': submission_id,
+                        'student_id': student_id,
+                        'quiz_id': quiz,
+                        'question_id': question,
+                        'selected_answer': correct if right else str(int(correct) + 1),
+                        'submission_date': submitted_at,
+                        'grade': '1' if right else '0',
+                    })
+                    submission_id += 1
+                writer.add(QuizResult, {
+                    'id': result_id, 'student_id': student_id, 'quiz_id': quiz,
+                    'score': float(score), 'max_score': len(questions), 'submitted_at': submitted_at,
+                })
+                result_id += 1
+
+    notice_id = _next_id(Notice)
+    for n in range(scale.notices):
+        course = rng.choices(course_ids, cum_weights=cum_weights)[0]
+        writer.add(Notice, {
+            'id': notice_id + n,
+            'title': f'Notice {n + 1}',
+            'content': 'Assignments for this week are now available. Check each course for the due dates.',
+            'date_posted': _when(rng),
+            'instructor_id': course_owner[course],
+            'course_id': course,
+        })
+    writer.flush()
+
+    rebuild_search_index()
+    reconcile_counters()  # The bulk inserts bypass the counters, lesson progress and unread notices
+    reconcile_progress()
+    reconcile_unread()
+    db.session.commit()
+    return writer.counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default=os.environ.get('DATABASE_URL'), help='Database URL (default: DATABASE_URL or config).')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    for field in Scale._fields:
+        parser.add_argument(f'--{field.replace("_", "-")}', type=float if field == 'take_rate' else int, help='Overrides the scale.')
+    parser.add_argument('--password', default='password123', help='Password of every generated user.')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per insert.')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed builds the same data.')
+    args = parser.parse_args(argv)
+
+    scale = SCALES[args.scale]._replace(**{
+        field: getattr(args, field) for field in Scale._fields if getattr(args, field) is not None
+    })
+    app = create_app({'SQLALCHEMY_DATABASE_URI': args.database} if args.database else None)
+    started = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        upgrade()
+        create_search_tables()
+        db.session.commit()
+        counts = seed(scale, password=args.password, chunk_size=args.chunk_size, rng=random.Random(args.seed))
+    print(json.dumps({
+        'database': app.config['SQLALCHEMY_DATABASE_URI'],
+        'scale': scale._asdict(),
+        'rows': counts,
+        'seconds': round(time.perf_counter() - started, 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/startup.py
+"""Cold-start benchmark: import + create_app() and the first request, each run in a fresh interpreter.
+
+    python benchmarks/startup.py --runs 7 --budget-ms 1500
+
+Prints a JSON report and exits non-zero if the median cold start is over budget,
+or if creating the app touched the database file.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child; the database points at a file that must not exist afterwards
+CHILD = r'''
+import json, os, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app({'TESTING': True})
+created = time.perf_counter()
+response = app.test_client().get(sys.argv[1])
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'status': response.status_code,
+    'db_created': os.path.exists(os.environ['STARTUP_DB_PATH']),
+}))
+'''
+
+
+def run_once(path, db_path):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f'sqlite:///{db_path}',
+        STARTUP_DB_PATH=db_path,
+        CACHE_BACKEND='memory'
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, path],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=1500, help='Median import + create_app() budget.')
+    parser.add_argument('--path', default='/privacy-policy', help='Page requested after startup; needs no database.')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = os.path.join(folder, 'startup.db')
+        samples = [run_once(args.path, db_path) for _ in range(args.runs)]
+
+    def median(key):
+        return round(statistics.median(sample[key] for sample in samples), 1)
+
+    startup_ms = round(statistics.median(s['import_ms'] + s['create_app_ms'] for s in samples), 1)
+    report = {
+        'runs': args.runs,
+        'import_ms': median('import_ms'),
+        'create_app_ms': median('create_app_ms'),
+        'first_request_ms': median('first_request_ms'),
+        'startup_ms': startup_ms,
+        'budget_ms': args.budget_ms,
+        'statuses': sorted({sample['status'] for sample in samples}),
+        'db_touched': any(sample['db_created'] for sample in samples),
+    }
+    report['ok'] = startup_ms <= args.budget_ms and not report['db_touched']
+    print(json.dumps(report, indent=2))
+    return 0 if report['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
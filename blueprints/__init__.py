@@ -0,0 +1,9 @@
+# blueprints/__init__.py
+
+
+def register_blueprints(app):
+    """Register the admin, instructor, student, public and API blueprints; imported here so importing the package stays cheap."""
+    from blueprints import admin, api, instructor, public, student
+
+    for module in (public, admin, instructor, student, api):
+        app.register_blueprint(module.bp)
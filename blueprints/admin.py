@@ -0,0 +1,160 @@
+# blueprints/admin.py
+
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request, jsonify
+from flask_login import login_user, login_required
+from werkzeug.security import check_password_hash
+from extensions import db, fragment_cache
+from models import User, Course, Student, RoleEnum, Instructor, Notice
+from auth import role_required
+from pagination import paginate_request
+from search import remove_entity
+from storage import collect_garbage, release
+from counters import course_deleted
+from identity import identity_cache
+from profiling import sql_profiler
+from roster import import_upload
+from forms import LoginForm, EditUserForm, ImportUsersForm
+
+# Routes for administrators: users, courses and operational reports
+bp = Blueprint('admin', __name__)
+
+@bp.route('/admin/login', methods=['GET', 'POST'])
+def admin_login():
+    """Admin login route."""
+    form = LoginForm()
+    if form.validate_on_submit():
+        username = form.username.data
+        password = form.password.data
+        user = User.query.filter_by(username=username, role='admin').first()
+        if user and check_password_hash(user.password, password):
+            login_user(user)
+            return redirect(url_for('admin.admin_dashboard'))
+        else:
+            flash('Invalid username or password', 'danger')
+    return render_template('admin_login.html', form=form)
+
+# Admin Dashboard
+@bp.route('/admin/dashboard')
+@role_required(RoleEnum.ADMIN)
+def admin_dashboard():
+    """Admin dashboard route."""
+    return render_template('admin_dashboard.html')
+
+@bp.route('/admin/cache_stats')
+@role_required(RoleEnum.ADMIN)
+def cache_stats():
+    """Fragment and user cache hit and miss counters of this worker, for tuning."""
+    return jsonify(fragments=fragment_cache.stats(), users=identity_cache.stats())
+
+@bp.route('/admin/reports')
+@role_required(RoleEnum.ADMIN)
+def view_reports():
+    """SQL profile of this worker: queries and DB time per endpoint, N+1 suspects and slow statements."""
+    report = sql_profiler.report()
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(report)
+    return render_template('view_reports.html', report=report)
+
+@bp.route('/admin/reports/reset', methods=['POST'])
+@role_required(RoleEnum.ADMIN)
+def reset_reports():
+    sql_profiler.reset()
+    flash('Query statistics cleared.', 'success')
+    return redirect(url_for('admin.view_reports'))
+
+@bp.route('/manage_courses')
+@login_required
+def manage_courses():
+    # Fetch one page of courses at a time, ordered by title
+    page = paginate_request(db.select(Course), [(Course.title, False), (Course.id, False)])
+    return render_template('manage_courses.html', courses=page.items, page=page)
+
+@bp.route('/delete_course/<int:course_id>', methods=['POST'])
+@login_required
+def delete_course(course_id):
+    course = Course.query.get_or_404(course_id)
+
+    course_deleted(course)
+
+    # Delete the course's materials and release their stored files
+    released = []
+    for material in course.materials:
+        if release(material.blob_sha256):
+            released.append(material.blob_sha256)
+        db.session.delete(material)
+
+    # And its notices
+    for notice in Notice.query.filter_by(course_id=course.id):
+        remove_entity('notice', notice.id)
+        db.session.delete(notice)
+
+    db.session.delete(course)
+    remove_entity('course', course.id)
+    db.session.commit()
+    fragment_cache.bump('courses', f'course:{course_id}')
+    collect_garbage(current_app.config['BLOB_FOLDER'], released)
+    flash('Course deleted successfully.', 'success')
+    return redirect(url_for('admin.manage_courses'))
+
+# Admin manage users
+@bp.route('/admin/manage_users')
+@role_required(RoleEnum.ADMIN)
+def manage_users():
+    """Admin manage users route."""
+    page = paginate_request(db.select(User), [(User.username, False), (User.id, False)])
+    return render_template('manage_users.html', users=page.items, page=page)
+
+@bp.route('/admin/edit_user/<int:user_id>', methods=['GET', 'POST'])
+@role_required(RoleEnum.ADMIN)
+def edit_user(user_id):
+    """Admin route to rename a user or change their role."""
+    user = User.query.get_or_404(user_id)
+    form = EditUserForm(obj=user)
+    if request.method == 'GET':
+        form.role.data = user.role.value
+    if form.validate_on_submit():
+        renamed = user.username != form.username.data
+        user.username = form.username.data
+        user.role = RoleEnum(form.role.data)
+        # Give the user the profile row their new role needs
+        if user.role == RoleEnum.INSTRUCTOR and db.session.get(Instructor, user.id) is None:
+            db.session.add(Instructor(id=user.id))
+        elif user.role == RoleEnum.STUDENT and db.session.get(Student, user.id) is None:
+            db.session.add(Student(id=user.id))
+        db.session.commit()
+        identity_cache.invalidate(user.id)
+        if renamed:
+            # Course cards and course pages show the instructor's name
+            course_ids = db.session.execute(db.select(Course.id).where(Course.instructor_id == user.id)).scalars().all()
+            if course_ids:
+                fragment_cache.bump('courses', *(f'course:{course_id}' for course_id in course_ids))
+        flash('User updated successfully.', 'success')
+        return redirect(url_for('admin.manage_users'))
+    return render_template('edit_user.html', form=form, user=user)
+
+@bp.route('/admin/import_users', methods=['GET', 'POST'])
+@role_required(RoleEnum.ADMIN)
+def import_users():
+    """Admin route to create many users, and their enrollments, from a CSV or JSONL file."""
+    form = ImportUsersForm()
+    report = None
+    if form.validate_on_submit():
+        report = import_upload(
+            form.source.data,
+            chunk_size=current_app.config['IMPORT_CHUNK_SIZE'],
+            workers=current_app.config['IMPORT_HASH_WORKERS']
+        )
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(report.to_dict())
+        flash(f'Created {report.created} users and {report.enrolled} enrollments.', 'success' if not report.errors else 'warning')
+    return render_template('import_users.html', form=form, report=report)
+
+@bp.route('/delete_user/<int:user_id>', methods=['POST'])
+@role_required(RoleEnum.ADMIN)
+def delete_user(user_id):
+    user = User.query.get_or_404(user_id)
+    db.session.delete(user)
+    db.session.commit()
+    identity_cache.invalidate(user_id)
+    flash('User deleted successfully.', 'success')
+    return redirect(url_for('admin.manage_users'))
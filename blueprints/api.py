@@ -0,0 +1,149 @@
+# blueprints/api.py
+
+from datetime import timezone
+
+from flask import Blueprint, abort, current_app, jsonify, request
+from flask_login import current_user, login_required
+from werkzeug.exceptions import HTTPException
+
+from catalog import COURSE, LESSON, MATERIAL, QUIZ, etag
+from extensions import db, read_only
+from models import Course, CourseMaterial, Enrollment, Lesson, Quiz, RoleEnum
+from pagination import paginate_request
+
+# Read-only JSON API over the course catalog, for the mobile client
+#
+# Every route takes ``fields`` (comma-separated) to choose the fields sent, and
+# listings take ``cursor`` and ``per_page``. Responses carry an ETag and
+# Last-Modified built from the version columns of the rows they cover, and a
+# request whose copy is still current gets 304 without its rows being read.
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+@bp.errorhandler(HTTPException)
+def handle_http_error(error):
+    return jsonify({'error': error.description}), error.code
+
+
+def _fields(schema):
+    try:
+        return schema.parse_fields(request.args.get('fields'))
+    except ValueError as error:
+        abort(400, str(error))
+
+
+def _not_modified(tag, last_modified):
+    """Whether the client's copy is current: by If-None-Match if it sent one, else by If-Modified-Since."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(tag)
+    since = request.if_modified_since
+    return (since is not None and last_modified is not None
+            and last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= since)
+
+
+def _respond(body, tag, last_modified):
+    response = jsonify(body) if body is not None else current_app.response_class(status=304)
+    response.set_etag(tag)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _resource(schema, *where):
+    """One resource, or 404."""
+    names = _fields(schema)
+    validators = schema.validators(*where)
+    if validators is None:
+        abort(404)
+    seed, last_modified = validators
+    tag = etag(seed, names)
+    if _not_modified(tag, last_modified):
+        return _respond(None, tag, last_modified)
+    row = db.session.execute(schema.select(names).where(*where)).one()
+    return _respond({'data': schema.serialize([row], names)[0]}, tag, last_modified)
+
+
+def _listing(schema, *where):
+    """A page of the resources matching ``where``, in the schema's order."""
+    names = _fields(schema)
+    seed, last_modified = schema.validators(*where) or (f'{schema.name}:0', None)
+    # The page depends on the cursor and page size as well as the rows
+    tag = etag(seed, names, sorted(request.args.items(multi=True)))
+    if _not_modified(tag, last_modified):
+        return _respond(None, tag, last_modified)
+    page = paginate_request(schema.select(names).where(*where), schema.order_by, rows=True)
+    return _respond({
+        'data': schema.serialize(page.items, names),
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    }, tag, last_modified)
+
+
+def _check_course_access(course_id):
+    """404 for a missing course; 403 unless the user is an admin, its instructor or one of its students."""
+    instructor_id = db.session.execute(db.select(Course.instructor_id).where(Course.id == course_id)).scalar()
+    if instructor_id is None:
+        abort(404)
+    if current_user.role == RoleEnum.ADMIN:
+        return
+    if current_user.role == RoleEnum.INSTRUCTOR and instructor_id == current_user.id:
+        return
+    if current_user.role == RoleEnum.STUDENT and db.session.execute(
+        db.select(Enrollment.id).where(Enrollment.student_id == current_user.id, Enrollment.course_id == course_id)
+    ).first():
+        return
+    abort(403)
+
+
+@bp.route('/courses')
+@read_only
+@login_required
+def list_courses():
+    """The course catalog; ``featured=1`` lists the featured courses only."""
+    if request.args.get('featured', '').lower() in ('1', 'true'):
+        return _listing(COURSE, Course.is_featured.is_(True))
+    return _listing(COURSE)
+
+
+@bp.route('/courses/<int:course_id>')
+@read_only
+@login_required
+def get_course(course_id):
+    """A course of the catalog."""
+    return _resource(COURSE, Course.id == course_id)
+
+
+@bp.route('/courses/<int:course_id>/lessons')
+@read_only
+@login_required
+def list_lessons(course_id):
+    """The lessons of a course, for its students and instructor."""
+    _check_course_access(course_id)
+    return _listing(LESSON, Lesson.course_id == course_id)
+
+
+@bp.route('/courses/<int:course_id>/materials')
+@read_only
+@login_required
+def list_materials(course_id):
+    """The materials of a course, for its students and instructor; files download from student.download_material."""
+    _check_course_access(course_id)
+    return _listing(MATERIAL, CourseMaterial.course_id == course_id)
+
+
+@bp.route('/courses/<int:course_id>/quizzes')
+@read_only
+@login_required
+def list_quizzes(course_id):
+    """The quizzes of a course, for its students and instructor; questions and answers are not included."""
+    _check_course_access(course_id)
+    return _listing(QUIZ, Quiz.course_id == course_id)
+
+
+@bp.route('/lessons/<slug>')
+@read_only
+@login_required
+def get_lesson(slug):
+    """A lesson, like the lesson page, with its content if asked for in ``fields``."""
+    return _resource(LESSON, Lesson.slug == slug)
@@ -0,0 +1,449 @@
+# blueprints/instructor.py
+
+from flask import Blueprint, Response, current_app, render_template, redirect, url_for, flash, request, abort, stream_with_context
+from flask_login import login_required, current_user
+from werkzeug.utils import secure_filename
+from extensions import db, fragment_cache, read_only
+from models import User, Course, CourseMaterial, Enrollment, Student, Quiz, RoleEnum, Lesson, Question, QuizSubmission, QuizResult, Notice
+from auth import role_required
+from search import index_entity, remove_entity
+from storage import add_stream, collect_garbage, release
+from grading import change_grade
+from gradebook import COURSE_COLUMNS, EXPORT_FORMATS, QUIZ_COLUMNS, course_rows, quiz_rows
+from counters import course_created, course_stats, instructor_stats, quiz_added
+from lessons import compile_lesson
+from notices import notice_broker, notice_posted
+from progress import lesson_added, lesson_deleted
+from forms import CourseForm, UploadMaterialForm, LessonForm, DeleteLessonForm, QuizForm, NoticeForm
+from slugify import slugify
+from collections import defaultdict
+from sqlalchemy.orm import contains_eager
+
+# Routes for instructors: courses, lessons, materials, quizzes and notices
+bp = Blueprint('instructor', __name__)
+
+# Instructor Dashboard
+@bp.route('/instructor_dashboard')
+@role_required(RoleEnum.INSTRUCTOR)
+def instructor_dashboard():
+    """Instructor dashboard route."""
+    # Access the instructor record linked to the current user
+    instructor = current_user.instructor  # This should now work correctly
+
+    # The totals come from the precomputed counters rather than counting enrollments and quizzes
+    stats = instructor_stats(instructor.id)
+    courses = Course.query.filter_by(instructor_id=instructor.id).all()  # Fetch all courses associated with the instructor
+
+    return render_template('instructor_dashboard.html',
+                           stats=stats,
+                           courses=courses,
+                           course_stats=course_stats([course.id for course in courses]))
+
+@bp.route('/instructor/view_courses')
+@role_required(RoleEnum.INSTRUCTOR)
+def view_courses():
+    """Route for instructors to view their courses."""
+    instructor = current_user.instructor
+    if not instructor:
+        flash('Instructor profile not found.', 'danger')
+        return redirect(url_for('public.index'))
+    
+    courses = Course.query.filter_by(instructor_id=instructor.id).all()
+    return render_template('view_courses.html', courses=courses)
+
+# 2.1. Route to Create a Lesson
+@bp.route('/instructor/create_lesson/<int:course_id>', methods=['GET', 'POST'])
+@role_required(RoleEnum.INSTRUCTOR)
+def create_lesson(course_id):
+    """Route for instructors to create a new lesson for a specific course."""
+    course = Course.query.get_or_404(course_id)
+    
+    # Ensure the current instructor owns the course
+    if course.instructor_id != current_user.instructor.id:
+        abort(403)  # Forbidden
+
+    form = LessonForm()
+    if form.validate_on_submit():
+        # Generate slug from the lesson title
+        slug = slugify(form.title.data)
+        
+        new_lesson = Lesson(
+            title=form.title.data,
+            content=form.content.data,
+            course_id=course.id,
+            slug=slug  # Save the slug in the lesson model
+        )
+        compile_lesson(new_lesson)
+        db.session.add(new_lesson)
+        db.session.flush()  # Assign the lesson id before indexing it
+        index_entity('lesson', new_lesson)
+        lesson_added(new_lesson)
+        db.session.commit()
+        fragment_cache.bump(f'course:{course.id}')
+        flash(f'Lesson "{new_lesson.title}" has been created successfully.', 'success')
+        return redirect(url_for('public.lesson_detail', slug=slug))  # Redirect to the lesson detail page
+    return render_template('create_lesson.html', form=form, course=course)
+
+# 2.2. Route to Edit a Lesson
+@bp.route('/instructor/edit_lesson/<int:lesson_id>', methods=['GET', 'POST'])
+@role_required(RoleEnum.INSTRUCTOR)
+def edit_lesson(lesson_id):
+    """Route for instructors to edit an existing lesson."""
+    lesson = Lesson.query.get_or_404(lesson_id)
+    course = lesson.course
+    
+    # Ensure the current instructor owns the course
+    if course.instructor_id != current_user.instructor.id:
+        abort(403)  # Forbidden
+
+    form = LessonForm(obj=lesson)
+    if form.validate_on_submit():
+        lesson.title = form.title.data
+        lesson.content = form.content.data
+        compile_lesson(lesson)
+        index_entity('lesson', lesson)
+        db.session.commit()
+        fragment_cache.bump(f'course:{course.id}')
+        flash(f'Lesson "{lesson.title}" has been updated successfully.', 'success')
+        return redirect(url_for('instructor.instructor_dashboard'))
+    return render_template('edit_lesson.html', form=form, lesson=lesson)
+
+# 2.3. Route to Delete a Lesson
+@bp.route('/instructor/delete_lesson/<int:lesson_id>', methods=['POST'])
+@role_required(RoleEnum.INSTRUCTOR)
+def delete_lesson(lesson_id):
+    """Route for instructors to delete a lesson."""
+    lesson = Lesson.query.get_or_404(lesson_id)
+    course = lesson.course
+    
+    # Ensure the current instructor owns the course
+    if course.instructor_id != current_user.instructor.id:
+        abort(403)  # Forbidden
+
+    form = DeleteLessonForm()
+    if form.validate_on_submit():
+        lesson_deleted(lesson)
+        db.session.delete(lesson)
+        remove_entity('lesson', lesson.id)
+        db.session.commit()
+        fragment_cache.bump(f'course:{course.id}')
+        flash(f'Lesson "{lesson.title}" has been deleted successfully.', 'success')
+    else:
+        flash('Failed to delete the lesson. Please try again.', 'danger')
+    return redirect(url_for('instructor.instructor_dashboard'))
+
+@bp.route('/instructor/create_course', methods=['GET', 'POST'])
+@role_required(RoleEnum.INSTRUCTOR)
+def create_course():
+    """Instructor create course route."""
+    form = CourseForm()
+    if form.validate_on_submit():
+        course = Course(
+            title=form.title.data,
+            description=form.description.data,
+            is_featured=form.is_featured.data,
+            instructor_id=current_user.instructor.id
+        )
+
+        db.session.add(course)
+        db.session.flush()  # Assign the course id before indexing it
+        index_entity('course', course)
+        course_created(course)
+        db.session.commit()
+        fragment_cache.bump('courses')
+        flash('Course created successfully!', 'success')
+        return redirect(url_for('instructor.instructor_dashboard'))
+    return render_template('create_course.html', form=form)
+
+@bp.route('/instructor/edit_course/<int:course_id>', methods=['GET', 'POST'])
+@role_required(RoleEnum.INSTRUCTOR)
+def edit_course(course_id):
+    """Route for instructors to edit an existing course."""
+    course = Course.query.get_or_404(course_id)
+    
+    # Ensure the current instructor owns the course
+    if course.instructor_id != current_user.instructor.id:
+        flash('You do not have permission to edit this course.', 'danger')
+        return redirect(url_for('instructor.view_courses'))
+    
+    form = CourseForm(obj=course)  # Pre-populate form with existing course data
+    if form.validate_on_submit():
+        course.title = form.title.data
+        course.description = form.description.data
+        course.is_featured = form.is_featured.data 
+        index_entity('course', course)
+        db.session.commit()
+        fragment_cache.bump('courses', f'course:{course.id}')
+        flash(f'Course "{course.title}" has been updated successfully.', 'success')
+        return redirect(url_for('instructor.view_courses'))
+    
+    return render_template('edit_course.html', form=form, course=course)
+
+@bp.route('/upload_material', methods=['GET', 'POST'])
+@login_required
+@role_required(RoleEnum.INSTRUCTOR)
+def upload_material():
+    """Route for instructors to upload course materials."""
+    form = UploadMaterialForm()
+
+    # Populate course choices dynamically
+    form.course.choices = [(course.id, course.title) for course in Course.query.filter_by(instructor_id=current_user.instructor.id).all()]
+
+    if form.validate_on_submit():
+        # Get the file from the form
+        file = form.material.data
+        if file:
+            filename = secure_filename(file.filename)
+            # Store the content once, however many courses share it
+            blob = add_stream(current_app.config['BLOB_FOLDER'], file.stream)
+
+            # Add the file to the database
+            new_material = CourseMaterial(filename=filename, course_id=form.course.data, blob_sha256=blob.sha256)
+            db.session.add(new_material)
+            db.session.commit()
+            fragment_cache.bump(f'course:{new_material.course_id}')
+
+            flash('Course material uploaded successfully!', 'success')
+            return redirect(url_for('instructor.instructor_dashboard'))
+
+    return render_template('upload_material.html', form=form)
+
+@bp.route('/delete_material/<int:material_id>', methods=['POST'])
+@role_required(RoleEnum.INSTRUCTOR)
+def delete_material(material_id):
+    """Route for instructors to delete a course material."""
+    material = CourseMaterial.query.get_or_404(material_id)
+
+    # Ensure the current instructor owns the course
+    if material.course.instructor_id != current_user.instructor.id:
+        abort(403)  # Forbidden
+
+    # Remove the stored file once no other material or submission uses it
+    sha256 = material.blob_sha256
+    unreferenced = release(sha256)
+    db.session.delete(material)
+    db.session.commit()
+    fragment_cache.bump(f'course:{material.course_id}')
+    if unreferenced:
+        collect_garbage(current_app.config['BLOB_FOLDER'], [sha256])
+    flash(f'Material "{material.filename}" has been deleted.', 'success')
+    return redirect(url_for('public.course_details', course_id=material.course_id))
+
+@bp.route('/instructor/manage_students')
+@login_required
+def manage_students():
+    """List students with their courses and quiz scores, one page at a time."""
+    page = request.args.get('page', 1, type=int)
+    course_id = request.args.get('course_id', type=int)
+
+    # Page through students (with their user row) instead of loading everyone
+    students_query = db.select(Student).join(Student.user).options(contains_eager(Student.user)).order_by(User.username, Student.id)
+    if course_id:
+        enrolled_ids = db.select(Enrollment.student_id).where(Enrollment.course_id == course_id)
+        students_query = students_query.where(Student.id.in_(enrolled_ids))
+    pagination = db.paginate(students_query, page=page, per_page=current_app.config['STUDENTS_PER_PAGE'], error_out=False)
+    student_ids = [student.id for student in pagination.items]
+
+    # Fetch the course titles for every student on this page in one query
+    courses_by_student = defaultdict(list)
+    if student_ids:
+        course_rows = db.session.execute(
+            db.select(Enrollment.student_id, Course.title)
+            .join(Course, Course.id == Enrollment.course_id)
+            .where(Enrollment.student_id.in_(student_ids))
+            .order_by(Enrollment.student_id, Course.title)
+        )
+        for student_id, title in course_rows:
+            courses_by_student[student_id].append(title)
+
+    # Read the materialized quiz totals for every student on this page in one query
+    quizzes_by_student = defaultdict(list)
+    if student_ids:
+        quiz_rows = db.session.execute(
+            db.select(QuizResult.student_id, Quiz.title, QuizResult.score, QuizResult.max_score)
+            .join(Quiz, Quiz.id == QuizResult.quiz_id)
+            .where(QuizResult.student_id.in_(student_ids))
+            .order_by(QuizResult.student_id, Quiz.title)
+        )
+        for student_id, title, score, max_score in quiz_rows:
+            quizzes_by_student[student_id].append((title, f'{score:g}/{max_score}'))
+
+    student_courses_quizzes = [{
+        'student': student,
+        'courses': courses_by_student[student.id],
+        'quizzes': quizzes_by_student[student.id]
+    } for student in pagination.items]
+
+    courses = db.session.execute(db.select(Course.id, Course.title).order_by(Course.title)).all()
+
+    return render_template('manage_students.html',
+                           student_courses_quizzes=student_courses_quizzes,
+                           pagination=pagination,
+                           courses=courses,
+                           selected_course_id=course_id)
+
+@bp.route('/create_quiz/<int:course_id>', methods=['GET', 'POST'])
+@login_required
+def create_quiz(course_id):
+    if current_user.role != RoleEnum.INSTRUCTOR:
+        flash('You are not authorized to access this page.')
+        return redirect(url_for('public.index'))
+
+    form = QuizForm()
+    
+    if form.validate_on_submit():
+        # Create the quiz object
+        quiz = Quiz(title=form.title.data, status=form.status.data, course_id=course_id)
+        db.session.add(quiz)
+        quiz_added(quiz)
+        db.session.commit()
+
+        # Add questions to the quiz
+        for question in form.questions:
+            # Ensure that each question has valid data
+            question_data = question.data
+            question_model = Question(
+                question_text=question_data['question_text'],
+                correct_answer=question_data['correct_answer'],
+                quiz_id=quiz.id
+            )
+            db.session.add(question_model)
+
+        db.session.commit()
+        fragment_cache.bump(f'course:{course_id}')
+        flash('Quiz created successfully!', 'success')
+        return redirect(url_for('instructor.instructor_dashboard'))
+
+    return render_template('create_quiz.html', form=form, course_id=course_id)
+
+def _export(rows, columns, filename, fmt):
+    """Stream rows as a CSV or XLSX download while they are read from the database."""
+    encode, mimetype = EXPORT_FORMATS[fmt]
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+    # The generator keeps the request (and its database session) open until the last chunk is sent
+    response = Response(stream_with_context(encode(columns, rows(batch_size), batch_size)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let nginx pass chunks on as they come
+    return response
+
+@bp.route('/instructor/gradebook/<int:course_id>.<any(csv, xlsx):fmt>')
+@read_only
+@role_required(RoleEnum.INSTRUCTOR)
+def export_gradebook(course_id, fmt):
+    """Download the quiz results and assignment grades of a course."""
+    course = Course.query.get_or_404(course_id)
+    if course.instructor_id != current_user.instructor.id:
+        abort(403)  # Forbidden
+    return _export(lambda batch_size: course_rows(course.id, batch_size), COURSE_COLUMNS,
+                   f'{slugify(course.title)}-grades', fmt)
+
+@bp.route('/instructor/gradebook/<int:course_id>/quiz/<int:quiz_id>.<any(csv, xlsx):fmt>')
+@read_only
+@role_required(RoleEnum.INSTRUCTOR)
+def export_quiz_answers(course_id, quiz_id, fmt):
+    """Download every answer given to a quiz, with its grade."""
+    quiz = Quiz.query.filter_by(id=quiz_id, course_id=course_id).first_or_404()
+    if quiz.course.instructor_id != current_user.instructor.id:
+        abort(403)  # Forbidden
+    return _export(lambda batch_size: quiz_rows(quiz.id, batch_size), QUIZ_COLUMNS,
+                   f'{slugify(quiz.course.title)}-{slugify(quiz.title)}-answers', fmt)
+
+@bp.route('/instructor/view_submissions/<int:course_id>/<int:quiz_id>', methods=['GET'])
+@login_required
+def view_submissions(course_id, quiz_id):
+    if current_user.role != RoleEnum.INSTRUCTOR:
+        flash('You are not authorized to access this page.')
+        return redirect(url_for('public.index'))
+
+    quiz = Quiz.query.get_or_404(quiz_id)
+    page = request.args.get('page', 1, type=int)
+
+    # Page through the materialized results of this quiz, with students and users
+    results_query = (
+        db.select(QuizResult)
+        .join(QuizResult.student)
+        .join(Student.user)
+        .options(contains_eager(QuizResult.student).contains_eager(Student.user))
+        .where(QuizResult.quiz_id == quiz_id)
+        .order_by(User.username, QuizResult.id)
+    )
+    pagination = db.paginate(results_query, page=page, per_page=current_app.config['SUBMISSIONS_PER_PAGE'], error_out=False)
+    student_ids = [result.student_id for result in pagination.items]
+
+    # Expand the individual answers for this page only, with question texts loaded once
+    answers_by_student = defaultdict(list)
+    if student_ids:
+        question_texts = dict(db.session.execute(
+            db.select(Question.id, Question.question_text).where(Question.quiz_id == quiz_id)
+        ).all())
+        answer_rows = db.session.execute(
+            db.select(QuizSubmission.id, QuizSubmission.student_id, QuizSubmission.question_id,
+                      QuizSubmission.selected_answer, QuizSubmission.grade)
+            .where(QuizSubmission.quiz_id == quiz_id, QuizSubmission.student_id.in_(student_ids))
+            .order_by(QuizSubmission.student_id, QuizSubmission.question_id, QuizSubmission.id)
+        )
+        for answer in answer_rows:
+            answers_by_student[answer.student_id].append({
+                'id': answer.id,
+                'question_text': question_texts.get(answer.question_id, ''),
+                'selected_answer': answer.selected_answer,
+                'grade': answer.grade
+            })
+
+    review_rows = [{
+        'student': result.student,
+        'result': result,
+        'answers': answers_by_student[result.student_id]
+    } for result in pagination.items]
+
+    return render_template('view_submissions.html', quiz=quiz, course_id=course_id,
+                           review_rows=review_rows, pagination=pagination)
+
+@bp.route('/grade_submission/<int:submission_id>', methods=['POST'])
+@login_required
+def grade_submission(submission_id):
+    """Handles manual grading for quiz submissions."""
+    submission = QuizSubmission.query.get_or_404(submission_id)
+    grade = request.form.get('grade')
+
+    if grade.isdigit():  # Ensure the grade is a valid number
+        change_grade(submission, int(grade))  # Also keeps the student's QuizResult in sync
+        db.session.commit()
+
+        flash('Grade assigned successfully!', 'success')
+    else:
+        flash('Invalid grade input. Please enter a number.', 'danger')
+
+    # Pass both course_id and quiz_id to the redirect URL
+    return redirect(url_for('instructor.view_submissions', course_id=submission.quiz.course_id, quiz_id=submission.quiz_id))
+
+@bp.route('/instructor/post_notice', methods=['GET', 'POST'])
+@login_required
+def post_notice():
+    if current_user.role != RoleEnum.INSTRUCTOR:
+        flash('You are not authorized to post notices.', 'danger')
+        return redirect(url_for('public.index'))
+
+    form = NoticeForm()  # We'll create this form next
+
+    # Notices go to the students of one of the instructor's courses
+    form.course.choices = [(course.id, course.title) for course in Course.query.filter_by(instructor_id=current_user.instructor.id).all()]
+
+    if form.validate_on_submit():
+        notice = Notice(
+            title=form.title.data,
+            content=form.content.data,
+            instructor_id=current_user.id,
+            course_id=form.course.data
+        )
+        db.session.add(notice)
+        db.session.flush()  # Assign the notice id before indexing it
+        index_entity('notice', notice)
+        notice_posted(notice)
+        db.session.commit()
+        notice_broker.notify()
+        flash('Notice posted successfully!', 'success')
+        return redirect(url_for('instructor.instructor_dashboard'))  # Redirect back to instructor dashboard
+
+    return render_template('post_notice.html', form=form)
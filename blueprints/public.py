@@ -0,0 +1,387 @@
+# blueprints/public.py
+
+import io
+
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request, abort, jsonify, make_response, session
+from flask_login import login_user, logout_user, login_required, current_user
+from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.utils import secure_filename
+from extensions import db, fragment_cache, read_only
+from models import User, Course, CourseMaterial, Submission, Enrollment, Student, RoleEnum, Instructor, Lesson, UploadSession
+from pagination import paginate_request
+from search import SEARCH_INDEXES, search
+from storage import add_file, staging_folder
+from uploads import UploadError, start_session, write_chunk, finish_session, discard_session
+from lessons import compile_lesson
+from counters import submission_added
+from roster import enroll_students
+from progress import is_completed
+from notices import unread_count
+from forms import RegistrationForm, LoginForm, DeleteLessonForm, CompleteLessonForm, ALLOWED_MATERIAL_EXTENSIONS
+from markupsafe import Markup
+
+# Routes open to everyone or shared by every role: login, pages, lessons, search and uploads
+bp = Blueprint('public', __name__)
+
+#registration route
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    """User registration route."""
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        try:
+            # Create a new user
+            hashed_password = generate_password_hash(form.password.data, method='pbkdf2:sha256')
+            # Ensure the role is passed correctly as an enum
+            role_enum = RoleEnum[form.role.data.upper()]
+        except KeyError:
+            flash('Invalid role selected.', 'danger')
+            return render_template('register.html', form=form)
+
+        new_user = User(username=form.username.data, password=hashed_password, role=role_enum)
+        db.session.add(new_user)
+        db.session.commit()
+
+        # Create Instructor or Student record based on role
+        if new_user.role == RoleEnum.INSTRUCTOR:
+            new_instructor = Instructor(id=new_user.id)  # Use 'id' instead of 'user_id'
+            db.session.add(new_instructor)
+        elif new_user.role == RoleEnum.STUDENT:
+            new_student = Student(id=new_user.id)  # Use 'id' instead of 'user_id'
+            db.session.add(new_student)
+
+        db.session.commit()
+        flash('Your account has been created! You can now log in.', 'success')
+        return redirect(url_for('public.login'))
+    return render_template('register.html', form=form)
+
+#login route
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """User login route."""
+    form = LoginForm()
+    if form.validate_on_submit():
+        user = User.query.filter_by(username=form.username.data).first()
+
+        # Check if user exists and password is correct
+        if user and check_password_hash(user.password, form.password.data):
+            login_user(user)
+
+            # Redirect based on user role
+            if user.role == RoleEnum.ADMIN:
+                return redirect(url_for('admin.admin_dashboard'))
+            elif user.role == RoleEnum.INSTRUCTOR:
+                return redirect(url_for('instructor.instructor_dashboard'))
+            elif user.role == RoleEnum.STUDENT:
+                return redirect(url_for('student.student_dashboard'))
+            else:
+                return redirect(url_for('public.logout'))  # Fallback for unhandled roles
+        else:
+            flash('Login failed. Please check your username and password.', 'danger')
+    return render_template('login.html', form=form)
+
+@bp.route('/lesson/<slug>')
+def lesson_detail(slug):
+    """Serve a lesson's precompiled HTML, answering 304 when the reader's copy is current."""
+    lesson = Lesson.query.filter_by(slug=slug).first_or_404()
+    if lesson.content_html is None or lesson.content_hash is None:
+        # Not backfilled yet; render it once now
+        compile_lesson(lesson)
+        db.session.commit()
+
+    # The navbar differs per user, so the ETag covers the viewer as well as the lesson
+    viewer = f'{current_user.id}.{current_user.role.value}' if current_user.is_authenticated else 'anon'
+    # Enrolled students also see whether they completed the lesson, and every student the unread notices badge
+    enrolled = completed = False
+    if current_user.is_authenticated and current_user.role == RoleEnum.STUDENT:
+        enrolled = Enrollment.query.filter_by(student_id=current_user.id, course_id=lesson.course_id).first() is not None
+        completed = enrolled and is_completed(current_user.id, lesson.id)
+        viewer += '-done' if completed else '-open' if enrolled else ''
+        viewer += f'-{unread_count(current_user.id)}'
+    etag = f'{lesson.content_hash[:32]}-{viewer}'
+    if request.if_none_match.contains(etag) and not session.get('_flashes'):
+        response = make_response('', 304)
+    else:
+        form = CompleteLessonForm() if enrolled and not completed else None
+        response = make_response(render_template('lesson_detail.html', lesson=lesson, completed=completed, form=form))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@bp.route('/course/<int:course_id>')
+@read_only
+@login_required
+def course_details(course_id):
+    """Route to view course details and manage materials."""
+    course = Course.query.get_or_404(course_id)
+
+    if current_user.role == RoleEnum.STUDENT:
+        # Check if the student is enrolled in the course
+        enrollment = Enrollment.query.filter_by(student_id=current_user.student.id, course_id=course_id).first()
+        if not enrollment:
+            flash('You are not enrolled in this course.', 'danger')
+            return redirect(url_for('student.browse_courses'))
+        
+        def render_body():
+            return render_template('fragments/course_details.html', course=course, lessons=course.lessons,
+                                   materials=course.materials, quizzes=course.quizzes)
+
+        # Every enrolled student sees the same page, so it is cached per course
+        course_body = fragment_cache.fragment('course_details', [f'course:{course.id}'], render_body)
+        return render_template('course_details.html', course_body=course_body)
+    
+    elif current_user.role == RoleEnum.INSTRUCTOR:
+        # Ensure the instructor owns the course
+        if course.instructor_id != current_user.instructor.id:
+            flash('You do not have permission to view this course.', 'danger')
+            return redirect(url_for('instructor.instructor_dashboard'))
+        
+        lessons = course.lessons
+        materials = course.materials
+        quizzes = course.quizzes
+        delete_form = DeleteLessonForm()
+        course_body = Markup(render_template('fragments/course_details.html', course=course, lessons=lessons,
+                                             materials=materials, quizzes=quizzes, form=delete_form))
+        return render_template('course_details.html', course_body=course_body)
+    
+    else:
+        # For other roles, deny access
+        flash('Access denied.', 'danger')
+        abort(403)
+
+@bp.route('/course/<int:course_id>/enrollments', methods=['POST'])
+@login_required
+def bulk_enroll(course_id):
+    """Enroll many students in a course at once; for admins and the course's instructor.
+
+    Send JSON {"students": [...]} with student ids or usernames, or a CSV with a
+    student_id or username column, uploaded as ``file`` or sent as a text/csv
+    body. Repeating a request is harmless: students already enrolled are
+    reported as such. Answers with the outcome of every row.
+    """
+    course = Course.query.get_or_404(course_id)
+    if not (current_user.role == RoleEnum.ADMIN
+            or (current_user.role == RoleEnum.INSTRUCTOR and course.instructor_id == current_user.instructor.id)):
+        abort(403)
+
+    if request.is_json:
+        data = request.get_json(silent=True)
+        source = data.get('students') if isinstance(data, dict) else None
+        if not isinstance(source, list):
+            return jsonify({'error': 'Send {"students": [...]} with student ids or usernames.'}), 400
+        fmt = 'json'
+    elif 'file' in request.files:
+        source, fmt = io.TextIOWrapper(request.files['file'].stream, encoding='utf-8-sig', newline=''), 'csv'
+    elif request.mimetype == 'text/csv':
+        source, fmt = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline=''), 'csv'
+    else:
+        return jsonify({'error': 'Send JSON, a CSV file upload or a text/csv body.'}), 400
+
+    try:
+        report = enroll_students(course.id, source, fmt, chunk_size=current_app.config['ENROLL_CHUNK_SIZE'],
+                                 max_rows=current_app.config['ENROLL_MAX_ROWS'])
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    fragment_cache.bump(*(f'enrollments:{student_id}' for student_id in report.enrolled_ids))
+    return jsonify(report.to_dict())
+
+def upload_staging_folder():
+    """Folder where chunked uploads are assembled before they move into the blob store."""
+    return staging_folder(current_app.config['BLOB_FOLDER'])
+
+@bp.app_errorhandler(UploadError)
+def handle_upload_error(error):
+    return jsonify({'error': error.message}), error.status
+
+def get_upload_session(session_id):
+    """Load an upload session owned by the current user, or 404."""
+    upload = UploadSession.query.get_or_404(session_id)
+    if upload.user_id != current_user.id:
+        abort(404)
+    return upload
+
+def upload_status(upload):
+    return {
+        'session_id': upload.id,
+        'chunk_size': upload.chunk_size,
+        'total_size': upload.total_size,
+        'received_bytes': upload.received_bytes,
+        'next_chunk': upload.next_chunk
+    }
+
+@bp.route('/uploads', methods=['POST'])
+@login_required
+def start_upload():
+    """Open a chunked upload session for a course material or an assignment."""
+    data = request.get_json(silent=True) or request.form
+    purpose = data.get('purpose')
+    filename = secure_filename(data.get('filename') or '')
+    try:
+        course_id = int(data.get('course_id'))
+        total_size = int(data.get('total_size'))
+    except (TypeError, ValueError):
+        raise UploadError('course_id and total_size are required.')
+
+    course = Course.query.get_or_404(course_id)
+    if purpose == 'material':
+        # Only the course's instructor may upload materials
+        if current_user.role != RoleEnum.INSTRUCTOR or course.instructor_id != current_user.instructor.id:
+            abort(403)
+        if filename.rsplit('.', 1)[-1].lower() not in ALLOWED_MATERIAL_EXTENSIONS:
+            raise UploadError('Documents only!')
+    elif purpose == 'assignment':
+        # Only enrolled students may submit assignments
+        if current_user.role != RoleEnum.STUDENT or not Enrollment.query.filter_by(student_id=current_user.student.id, course_id=course.id).first():
+            abort(403)
+    else:
+        raise UploadError('purpose must be "material" or "assignment".')
+
+    if not filename:
+        raise UploadError('filename is required.')
+    if not 0 < total_size <= current_app.config['UPLOAD_MAX_FILE_SIZE']:
+        raise UploadError('File is empty or too large.', status=413)
+
+    upload = start_session(current_user.id, purpose, course.id, filename, total_size,
+                           upload_staging_folder(), current_app.config['UPLOAD_CHUNK_SIZE'])
+    db.session.commit()
+    return jsonify(upload_status(upload)), 201
+
+@bp.route('/uploads/<session_id>', methods=['GET'])
+@login_required
+def upload_progress(session_id):
+    """Report how far an upload got, so the client can resume after a disconnect."""
+    return jsonify(upload_status(get_upload_session(session_id)))
+
+@bp.route('/uploads/<session_id>/chunks/<int:index>', methods=['PUT', 'POST'])
+@login_required
+def upload_chunk(session_id, index):
+    """Append one chunk, sent as the raw request body, to an upload session."""
+    upload = get_upload_session(session_id)
+    write_chunk(upload, index, request.stream, upload_staging_folder())
+    db.session.commit()
+    return jsonify(upload_status(upload))
+
+@bp.route('/uploads/<session_id>/commit', methods=['POST'])
+@login_required
+def commit_upload(session_id):
+    """Verify a complete upload, move it into place and record it."""
+    upload = get_upload_session(session_id)
+    data = request.get_json(silent=True) or request.form
+    purpose, course_id, filename = upload.purpose, upload.course_id, upload.filename
+    path, sha256 = finish_session(upload, upload_staging_folder(), expected_sha256=data.get('sha256'))
+
+    # Move the file into the blob store, or drop it if the same content is already stored
+    blob = add_file(current_app.config['BLOB_FOLDER'], path, sha256)
+    discard_session(upload, upload_staging_folder())
+
+    if purpose == 'material':
+        record = CourseMaterial(filename=filename, course_id=course_id, blob_sha256=blob.sha256)
+        redirect_url = url_for('instructor.instructor_dashboard')
+    else:
+        record = Submission(student_id=current_user.student.id, course_id=course_id, submission_file=filename, blob_sha256=blob.sha256)
+        redirect_url = url_for('public.course_details', course_id=course_id)
+    db.session.add(record)
+    if purpose != 'material':
+        submission_added(record)
+    db.session.commit()
+    if purpose == 'material':
+        fragment_cache.bump(f'course:{course_id}')
+    return jsonify({'id': record.id, 'filename': filename, 'redirect': redirect_url}), 201
+
+@bp.route('/uploads/<session_id>', methods=['DELETE'])
+@login_required
+def cancel_upload(session_id):
+    """Abandon an upload session and delete its partial file."""
+    upload = get_upload_session(session_id)
+    discard_session(upload, upload_staging_folder())
+    db.session.commit()
+    return '', 204
+
+@bp.route('/view_course_materials/<int:course_id>')
+@read_only
+@login_required
+def view_course_materials(course_id):
+    materials = CourseMaterial.query.filter_by(course_id=course_id).all()
+    course = Course.query.get_or_404(course_id)
+    return render_template('view_course_materials.html', materials=materials, course=course)
+
+
+
+#@bp.route('/manage_students')
+#@role_required(RoleEnum.ADMIN)
+#def manage_students():
+    #"""Admin manage students route."""
+    #students = Student.query.all()
+    #return render_template('manage_students.html', students=students)
+
+@bp.route('/search')
+@read_only
+@login_required
+def search_view():
+    """Ranked full-text search over courses, lessons and notices."""
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('type')
+    page = max(request.args.get('page', 1, type=int), 1)
+    kinds = [kind] if kind in SEARCH_INDEXES else None
+
+    # Notices are only found by the students and instructor of their course; admins find them all
+    notice_courses = None
+    if current_user.role == RoleEnum.STUDENT:
+        notice_courses = db.session.execute(
+            db.select(Enrollment.course_id).where(Enrollment.student_id == current_user.id)
+        ).scalars().all()
+    elif current_user.role == RoleEnum.INSTRUCTOR:
+        notice_courses = db.session.execute(db.select(Course.id).where(Course.instructor_id == current_user.id)).scalars().all()
+
+    hits, has_next = search(query, kinds=kinds, page=page, per_page=current_app.config['PER_PAGE'],
+                            notice_courses=notice_courses)
+
+    # Lessons are linked by slug, so look those up for this page in one query
+    lesson_ids = [hit.id for hit in hits if hit.kind == 'lesson']
+    lesson_slugs = {}
+    if lesson_ids:
+        lesson_slugs = dict(db.session.execute(db.select(Lesson.id, Lesson.slug).where(Lesson.id.in_(lesson_ids))).all())
+
+    return render_template('search.html', query=query, kind=kind if kinds else None, hits=hits,
+                           lesson_slugs=lesson_slugs, page=page, has_next=has_next)
+
+@bp.route('/grading')
+def grading():
+    return render_template('grading.html')
+
+@bp.route('/instructor_support')
+def instructor_support():
+    return render_template('instructor_support.html')
+
+@bp.route('/assignment_overview')
+def assignment_overview():
+    return render_template('assignment_overview.html')
+
+@bp.route('/privacy-policy')
+def privacy_policy():
+    return render_template('privacy_policy.html')
+
+@bp.route('/terms-of-service')
+def terms_of_service():
+    return render_template('terms_of_service.html')
+
+@bp.route('/')
+@read_only
+def index():
+    def render_featured():
+        # Fetch one page of featured courses
+        featured = db.select(Course).where(Course.is_featured == True)
+        page = paginate_request(featured, [(Course.title, False), (Course.id, False)])
+        return render_template('fragments/featured_courses.html', courses=page.items, page=page)
+
+    featured_courses = fragment_cache.fragment('featured_courses', ['courses'], render_featured,
+                                               request.args.get('cursor'), request.args.get('per_page'))
+    return render_template('index.html', featured_courses=featured_courses)
+
+@bp.route('/logout')
+@login_required
+def logout():
+    """User logout route."""
+    logout_user()
+    flash('You have been logged out.', 'success')
+    return redirect(url_for('public.login'))
@@ -0,0 +1,280 @@
+# blueprints/student.py
+
+from flask import Blueprint, Response, current_app, render_template, redirect, url_for, flash, request
+from flask_login import login_required, current_user
+from werkzeug.utils import secure_filename
+from extensions import db, fragment_cache, read_only
+from models import Course, CourseMaterial, Lesson, Submission, Enrollment, Quiz, RoleEnum, Instructor, QuizSubmission, Notice
+from auth import role_required
+from pagination import paginate_request
+from delivery import send_stored_file
+from storage import add_stream, blob_path
+from counters import enrollments_added, submission_added
+from progress import complete_lesson
+from notices import mark_read, notice_broker, notices_since, read_markers, unread_state
+from grading import AnswerNormalizer, load_answer_key, submit_answers
+from forms import CompleteLessonForm, EnrollCourseForm, QuestionForm, QuizForm
+from flask_wtf.csrf import generate_csrf
+from markupsafe import Markup
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
+
+# Routes for students: enrolling, course materials, quizzes and notices
+bp = Blueprint('student', __name__)
+
+# Stands in for the CSRF token inside cached fragments; replaced per request
+CSRF_PLACEHOLDER = '__csrf_token__'
+
+# Student Dashboard
+@bp.route('/student_dashboard')
+@role_required(RoleEnum.STUDENT)
+def student_dashboard():
+    """Student dashboard route."""
+    courses = Course.query.join(Enrollment).filter(Enrollment.student_id == current_user.student.id).all()
+    return render_template('student_dashboard.html', courses=courses)
+
+@bp.route('/browse_courses')
+@read_only
+@role_required(RoleEnum.STUDENT)
+def browse_courses():
+    """Route for students to browse available courses."""
+    student_id = current_user.student.id
+
+    def render_cards():
+        # Courses the student is already enrolled in, as a subquery
+        enrolled_course_ids = db.select(Enrollment.course_id).where(Enrollment.student_id == student_id)
+
+        # Fetch one page of courses that the student is not enrolled in, with their instructors
+        available_courses = (
+            db.select(Course)
+            .where(~Course.id.in_(enrolled_course_ids))
+            .options(joinedload(Course.instructor).joinedload(Instructor.user))
+        )
+        page = paginate_request(available_courses, [(Course.title, False), (Course.id, False)])
+        return render_template('fragments/course_cards.html', courses=page.items, page=page,
+                               csrf_placeholder=CSRF_PLACEHOLDER)
+
+    course_cards = fragment_cache.fragment('course_cards', ['courses', f'enrollments:{student_id}'], render_cards,
+                                           student_id, request.args.get('cursor'), request.args.get('per_page'))
+
+    # The cached cards are shared across sessions, so the enroll forms get this session's token here
+    course_cards = Markup(course_cards.replace(CSRF_PLACEHOLDER, generate_csrf()))
+    return render_template('browse_courses.html', course_cards=course_cards)
+
+#route to enroll in a course
+@bp.route('/enroll/<int:course_id>', methods=['POST'])
+@role_required(RoleEnum.STUDENT)
+def enroll(course_id):
+    """Route for students to enroll in a course."""
+    form = EnrollCourseForm()
+    if form.validate_on_submit():
+        # Check if the course exists
+        course = Course.query.get_or_404(course_id)
+        
+        # Check if the student is already enrolled
+        existing_enrollment = Enrollment.query.filter_by(student_id=current_user.student.id, course_id=course_id).first()
+        if existing_enrollment:
+            flash('You are already enrolled in this course.', 'warning')
+            return redirect(url_for('student.browse_courses'))
+        
+        # Create a new enrollment
+        new_enrollment = Enrollment(student_id=current_user.student.id, course_id=course_id)
+        db.session.add(new_enrollment)
+        enrollments_added([(new_enrollment.student_id, course_id)])
+        db.session.commit()
+        fragment_cache.bump(f'enrollments:{current_user.student.id}')
+        flash(f'You have successfully enrolled in {course.title}!', 'success')
+        return redirect(url_for('student.my_courses'))
+    else:
+        # If form validation fails, flash an error message
+        flash('Enrollment failed. Please try again.', 'danger')
+        return redirect(url_for('student.browse_courses'))
+
+@bp.route('/my_courses')
+@read_only
+@role_required(RoleEnum.STUDENT)
+def my_courses():
+    """Route for students to view their enrolled courses."""
+    courses = db.session.execute(
+        db.select(Course, Enrollment.progress).join(Enrollment).where(Enrollment.student_id == current_user.student.id)
+    ).all()
+    return render_template('my_courses.html', courses=courses)
+
+@bp.route('/lesson/<slug>/complete', methods=['POST'])
+@role_required(RoleEnum.STUDENT)
+def mark_lesson_complete(slug):
+    """Route for students to mark a lesson of one of their courses as complete."""
+    lesson = Lesson.query.filter_by(slug=slug).first_or_404()
+    enrollment = Enrollment.query.filter_by(student_id=current_user.student.id, course_id=lesson.course_id).first()
+    if not enrollment:
+        flash('You are not enrolled in this course.', 'danger')
+        return redirect(url_for('student.browse_courses'))
+
+    form = CompleteLessonForm()
+    if not form.validate_on_submit():
+        flash('Failed to mark the lesson as complete. Please try again.', 'danger')
+    elif complete_lesson(current_user.student.id, lesson):
+        db.session.commit()
+        flash(f'Lesson "{lesson.title}" marked as complete.', 'success')
+    else:
+        flash('You have already completed this lesson.', 'info')
+    return redirect(url_for('public.lesson_detail', slug=slug))
+
+@bp.route('/download_material/<int:material_id>')
+@read_only
+@role_required(RoleEnum.STUDENT)
+def download_material(material_id):
+    """Route to download course material."""
+    material = CourseMaterial.query.get_or_404(material_id)
+
+    # Check if the student is enrolled in the course
+    enrollment = Enrollment.query.filter_by(student_id=current_user.student.id, course_id=material.course_id).first()
+    if not enrollment:
+        flash('You are not authorized to access this material.', 'danger')
+        return redirect(url_for('student.browse_courses'))
+
+    # Send the file from the blob store (or the legacy upload directory), or hand it to the front proxy
+    if material.blob_sha256:
+        return send_stored_file(current_app.config['BLOB_FOLDER'], blob_path('', material.blob_sha256),
+                                download_name=material.filename, etag=material.blob_sha256,
+                                accel_prefix=current_app.config['BLOB_ACCEL_PREFIX'])
+    return send_stored_file(current_app.config['UPLOAD_FOLDER'], material.filename)
+
+@bp.route('/student/submit_assignment/<int:course_id>', methods=['POST'])
+@login_required
+def submit_assignment(course_id):
+    """Student submit assignment route."""
+    if current_user.role == RoleEnum.STUDENT:
+        file = request.files.get('file')
+        if file:
+            filename = secure_filename(file.filename)
+            blob = add_stream(current_app.config['BLOB_FOLDER'], file.stream)
+            submission = Submission(student_id=current_user.student.id, course_id=course_id, submission_file=filename, blob_sha256=blob.sha256)
+            db.session.add(submission)
+            submission_added(submission)
+            db.session.commit()
+            flash('Assignment submitted successfully!', 'success')
+            return redirect(url_for('public.course_details', course_id=course_id))
+    flash('Failed to submit assignment.', 'danger')
+    return redirect(url_for('public.index'))
+
+@bp.route('/student/view_enrolled_courses')
+@login_required
+def view_enrolled_courses():
+    """View enrolled courses route."""
+    return render_template('view_enrolled_courses.html')
+
+@bp.route('/course/<int:course_id>/quiz/<int:quiz_id>', methods=['GET', 'POST'])
+@login_required
+def take_quiz(course_id, quiz_id):
+    if current_user.role != RoleEnum.STUDENT:
+        flash('You are not authorized to access this page.')
+        return redirect(url_for('public.index'))
+
+    course = Course.query.get_or_404(course_id)
+    quiz = Quiz.query.get_or_404(quiz_id)
+
+    # Check if the student has already taken this quiz
+    existing_submission = QuizSubmission.query.filter_by(student_id=current_user.id, quiz_id=quiz.id).first()
+    if existing_submission:
+        flash('You have already taken this quiz and cannot retake it.', 'warning')
+        return redirect(url_for('student.student_dashboard'))  # Redirect to a relevant page
+
+    # Initialize the quiz form
+    form = QuizForm()
+    answer_key = load_answer_key(quiz.id)
+
+    if request.method == 'GET':
+        # Clear the form.questions before appending to avoid duplicates
+        form.questions.entries.clear()
+
+        # Append questions to the form
+        for entry in answer_key:
+            question_form = QuestionForm()
+            question_form.question_text.data = entry.question_text  # This should set the correct question text
+            form.questions.append_entry(question_form)
+
+    # Handle form submission
+    if form.validate_on_submit():
+        # Grade and save all submitted answers at once
+        selected_answers = [question_form.answer.data for question_form in form.questions]
+        submit_answers(current_user.id, quiz.id, selected_answers, AnswerNormalizer.from_config(current_app.config), answer_key=answer_key)
+        db.session.commit()
+        flash('Quiz submitted successfully!', 'success')
+        return redirect(url_for('student.student_dashboard'))
+
+    return render_template('take_quiz.html', course=course, quiz=quiz, form=form)
+
+@bp.route('/course/<int:course_id>/quiz/<int:quiz_id>/submit', methods=['POST'])
+@login_required
+def submit_quiz(course_id, quiz_id):
+    """Handles quiz submission and automatic grading."""
+    # Get the quiz by quiz_id
+    quiz = Quiz.query.get_or_404(quiz_id)
+    course = Course.query.get_or_404(course_id)
+    form = QuizForm(request.form)
+
+    if form.validate_on_submit():
+        # Grade the whole answer vector against the answer key and bulk insert the results
+        selected_answers = [question_form.answer.data for question_form in form.questions]
+        result = submit_answers(current_user.id, quiz.id, selected_answers, AnswerNormalizer.from_config(current_app.config))
+        db.session.commit()
+
+        flash(f"Quiz submitted successfully! Your total score: {result.score}/{result.max_score}", "success")
+        return redirect(url_for('public.course_details', course_id=course_id))
+
+    # Log which fields failed, never the submitted values (the form carries the CSRF token)
+    current_app.logger.debug('Quiz %s submission rejected; invalid fields: %s', quiz.id, ', '.join(form.errors))
+    flash("There was an error with your submission. Please try again.", "danger")
+
+    return render_template('take_quiz.html', course=course, quiz=quiz, form=form)
+
+@bp.route('/student/notices')
+@login_required
+def view_notices():
+    if current_user.role != RoleEnum.STUDENT:
+        flash('You are not authorized to view this page.', 'danger')
+        return redirect(url_for('public.index'))
+
+    # Fetch one page of the notices of the student's courses (and older notices without a course), newest first
+    enrolled = db.select(Enrollment.course_id).where(Enrollment.student_id == current_user.student.id)
+    query = (
+        db.select(Notice)
+        .where(or_(Notice.course_id.in_(enrolled), Notice.course_id.is_(None)))
+        .options(joinedload(Notice.course))
+    )
+    page = paginate_request(query, [(Notice.date_posted, True), (Notice.id, True)])
+
+    # Flag the notices posted since the last visit, then mark them all read
+    markers = read_markers(current_user.student.id)
+    if markers:
+        mark_read(current_user.student.id)
+        db.session.commit()
+    return render_template('view_notices.html', notices=page.items, page=page, markers=markers)
+
+@bp.route('/student/notices/stream')
+@role_required(RoleEnum.STUDENT)
+def notice_stream():
+    """Server-Sent Events stream of the notices posted in the student's courses."""
+    if not current_app.config['NOTICE_STREAM_ENABLED']:
+        return Response(status=204)  # Tells the browser not to reconnect
+
+    course_ids = list(db.session.execute(
+        db.select(Enrollment.course_id).where(Enrollment.student_id == current_user.student.id)
+    ).scalars())
+    unread, newest_id = unread_state(current_user.student.id)
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    backlog = []
+    if last_event_id:
+        # Reconnecting: send the notices posted while the browser was away
+        backlog = notices_since(course_ids, last_event_id, newest_id, current_app.config['NOTICE_REPLAY_LIMIT'])
+
+    # Notices after newest_id reach the stream however long the broker takes to see them
+    subscription = notice_broker.subscribe(course_ids, newest_id)
+
+    # The body is generated outside the request, so the stream holds no database connection
+    response = Response(notice_broker.stream(subscription, unread, newest_id, backlog), mimetype='text/event-stream')
+    response.call_on_close(lambda: notice_broker.unsubscribe(subscription))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the events
+    return response
@@ -0,0 +1,197 @@
+# cache.py
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+
+class MemoryBackend:
+    """In-process LRU cache bounded by the total size of the cached values in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            # Evict least recently used entries until we are back under budget
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+class SQLiteBackend:
+    """Cache in a local SQLite file shared by every worker process on the host."""
+
+    def __init__(self, path, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Opened on first use so that creating the app does no I/O
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute('SELECT value, expires_at FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        connection = self._connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires_at)
+        )
+        # Occasionally drop expired rows and trim the table to its size limit
+        if uuid.uuid4().int % 100 == 0:
+            connection.execute('DELETE FROM cache WHERE expires_at < ?', (time.time(),))
+            connection.execute(
+                'DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY rowid LIMIT max(0, (SELECT count(*) FROM cache) - ?))',
+                (self.max_entries,)
+            )
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+
+def _size_of(value):
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+class FragmentCache:
+    """Caches rendered fragments under keys versioned by the entities they show.
+
+    Every entity (e.g. ``course:3``) has a version token stored in the backend.
+    Bumping an entity replaces its token, so every key built from the old one
+    becomes unreachable and ages out of the backend instead of being deleted.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.default_ttl = None
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get('CACHE_BACKEND', 'memory')
+        if kind == 'memory':
+            self.backend = MemoryBackend(app.config.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        elif kind == 'sqlite':
+            self.backend = SQLiteBackend(app.config['CACHE_SQLITE_PATH'])
+        elif kind is None:
+            self.backend = None  # Caching disabled
+        else:
+            raise ValueError(f'Unknown CACHE_BACKEND {kind!r}')
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL')
+        app.extensions['fragment_cache'] = self
+
+    def version(self, entity):
+        """Return the current version token of an entity, creating one if needed."""
+        key = f'version:{entity}'
+        token = self.backend.get(key)
+        if token is None:
+            token = uuid.uuid4().hex[:12]
+            self.backend.set(key, token)
+        return token
+
+    def bump(self, *entities):
+        """Invalidate every fragment built from the given entities."""
+        if self.backend is None:
+            return
+        for entity in entities:
+            self.backend.set(f'version:{entity}', uuid.uuid4().hex[:12])
+
+    def key(self, name, entities, *parts):
+        versions = ','.join(f'{entity}@{self.version(entity)}' for entity in entities)
+        return f'fragment:{name}:{versions}:' + ':'.join(str(part) for part in parts)
+
+    def fragment(self, name, entities, render, *parts, ttl=None):
+        """Return the cached fragment for this name, entity versions and key parts, rendering it on a miss.
+
+        ``render`` returns the HTML string, or None if the result must not be cached.
+        """
+        if self.backend is None:
+            html = render()
+            return Markup(html) if html is not None else None
+        key = self.key(name, entities, *parts)
+        html = self.backend.get(key)
+        if html is not None:
+            self.hits += 1
+            return Markup(html)
+        self.misses += 1
+        html = render()
+        if html is None:
+            return None
+        self.backend.set(key, str(html), ttl or self.default_ttl)
+        return Markup(html)
+
+    def stats(self):
+        """Hit and miss counters of this process."""
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
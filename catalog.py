@@ -0,0 +1,156 @@
+# catalog.py
+"""Schemas of the catalog API: the fields of courses, lessons, materials and quizzes.
+
+Each schema names the column behind every field, so a request selects only the
+columns of the fields it asks for and the rows are turned into dicts by a plan
+built once per field set; no ORM objects are loaded. Every resource carries a
+version column, so the validators of a response come from one aggregate over
+the rows it covers, and an unchanged response is answered before it is read.
+"""
+
+import hashlib
+from functools import lru_cache
+
+from sqlalchemy import func
+
+from extensions import db
+from models import Blob, Course, CourseMaterial, Lesson, Quiz
+
+
+def _datetime(value):
+    return value.isoformat() if value is not None else None
+
+
+class Field:
+    """A field of a resource: the column it is read from and, if the value is not JSON as is, its encoder."""
+
+    __slots__ = ('column', 'encode')
+
+    def __init__(self, column, encode=None):
+        self.column = column
+        self.encode = encode
+
+
+class Schema:
+    """The fields of a resource, those sent when none are asked for, and the order of its listings.
+
+    The columns of ``order_by`` must be fields under their own names, so that a
+    page's cursor can be read from its rows.
+    """
+
+    def __init__(self, name, model, fields, default, order_by):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.default = tuple(default)
+        self.order_by = order_by
+
+    def parse_fields(self, value):
+        """The field names of a comma-separated ``fields`` argument, or the default ones; raises ValueError on unknown names."""
+        if not value:
+            return self.default
+        names = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ValueError(f"Unknown {self.name} fields: {', '.join(unknown) or value!r}. "
+                             f"Available: {', '.join(self.fields)}.")
+        return names
+
+    def select(self, names):
+        """A select of the columns of ``names`` and of the sort keys, labelled with their field names."""
+        columns = {name: self.fields[name].column for name in names}
+        for column, _ in self.order_by:
+            columns.setdefault(column.key, column)
+        return db.select(*(column.label(name) for name, column in columns.items()))
+
+    def serialize(self, rows, names):
+        """Dicts of the ``names`` fields of rows read with select(names)."""
+        plain, encoded = _plan(self, names)
+        items = []
+        for row in rows:
+            item = {name: row[index] for name, index in plain}
+            for name, index, encode in encoded:
+                item[name] = encode(row[index])
+            items.append(item)
+        return items
+
+    def validators(self, *where):
+        """(ETag seed, last modification) of the rows matching ``where``, or None if there are none.
+
+        Counts, the highest id and the sum of versions change with most inserts,
+        deletes and updates of matching rows; the latest modification time also
+        covers replacing the newest row, as SQLite reuses its id once deleted.
+        """
+        model = self.model
+        count, last_id, versions, updated_at = db.session.execute(
+            db.select(func.count(), func.max(model.id), func.sum(model.version), func.max(model.updated_at)).where(*where)
+        ).one()
+        if not count:
+            return None
+        return f'{self.name}:{count}:{last_id}:{versions}:{updated_at}', updated_at
+
+
+@lru_cache(maxsize=256)
+def _plan(schema, names):
+    """Where each field is in a row, split by whether it needs encoding."""
+    plain, encoded = [], []
+    for index, name in enumerate(names):
+        encode = schema.fields[name].encode
+        if encode is None:
+            plain.append((name, index))
+        else:
+            encoded.append((name, index, encode))
+    return plain, encoded
+
+
+def etag(seed, *parts):
+    """A strong ETag for a representation: the validators' seed and whatever else shapes the body."""
+    return hashlib.sha256(repr((seed,) + parts).encode()).hexdigest()[:32]
+
+
+COURSE = Schema('course', Course, {
+    'id': Field(Course.id),
+    'title': Field(Course.title),
+    'description': Field(Course.description),
+    'is_featured': Field(Course.is_featured),
+    'instructor_id': Field(Course.instructor_id),
+    'version': Field(Course.version),
+    'updated_at': Field(Course.updated_at, _datetime),
+}, default=('id', 'title', 'description', 'is_featured', 'instructor_id', 'version', 'updated_at'),
+   order_by=[(Course.title, False), (Course.id, False)])
+
+# The content is left out unless asked for; content_html is null for lessons saved before it existed,
+# until flask lessons-render fills it in
+LESSON = Schema('lesson', Lesson, {
+    'id': Field(Lesson.id),
+    'course_id': Field(Lesson.course_id),
+    'title': Field(Lesson.title),
+    'slug': Field(Lesson.slug),
+    'content': Field(Lesson.content),
+    'content_html': Field(Lesson.content_html),
+    'version': Field(Lesson.version),
+    'updated_at': Field(Lesson.updated_at, _datetime),
+}, default=('id', 'course_id', 'title', 'slug', 'version', 'updated_at'),
+   order_by=[(Lesson.id, False)])
+
+MATERIAL = Schema('material', CourseMaterial, {
+    'id': Field(CourseMaterial.id),
+    'course_id': Field(CourseMaterial.course_id),
+    'filename': Field(CourseMaterial.filename),
+    # Blobs never change, so the size is covered by the material's own version
+    'size': Field(db.select(Blob.size).where(Blob.sha256 == CourseMaterial.blob_sha256).scalar_subquery()),
+    'upload_date': Field(CourseMaterial.upload_date, _datetime),
+    'version': Field(CourseMaterial.version),
+    'updated_at': Field(CourseMaterial.updated_at, _datetime),
+}, default=('id', 'course_id', 'filename', 'size', 'upload_date', 'version', 'updated_at'),
+   order_by=[(CourseMaterial.id, False)])
+
+QUIZ = Schema('quiz', Quiz, {
+    'id': Field(Quiz.id),
+    'course_id': Field(Quiz.course_id),
+    'title': Field(Quiz.title),
+    'status': Field(Quiz.status),
+    'version': Field(Quiz.version),
+    'updated_at': Field(Quiz.updated_at, _datetime),
+}, default=('id', 'course_id', 'title', 'status', 'version', 'updated_at'),
+   order_by=[(Quiz.id, False)])
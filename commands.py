@@ -0,0 +1,169 @@
+# commands.py
+
+import os
+
+import click
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from counters import reconcile_counters
+from notices import reconcile_unread
+from progress import reconcile_progress
+from grading import rebuild_quiz_results
+from lessons import backfill_lessons
+from migrate import discover_migrations, pending_migrations, upgrade
+from query_plans import check_query_plans
+from roster import import_users
+from search import create_search_tables, rebuild_search_index
+from uploads import expire_sessions
+from storage import add_stream, collect_garbage, recount_references, staging_folder
+from models import CourseMaterial, RoleEnum, Submission, User
+
+
+def register_commands(app):
+    """Register the maintenance commands on the Flask CLI."""
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create the tables, apply pending migrations and set up the search index."""
+        db.create_all()
+        upgrade()  # Bring existing databases up to date; no-ops on a new one
+        create_search_tables()
+        db.session.commit()
+        click.echo('Database initialized.')
+
+    @app.cli.command('create-admin')
+    @click.option('--username', default='admin', show_default=True)
+    @click.option('--password', prompt=True, hide_input=True, confirmation_prompt=True, envvar='ADMIN_PASSWORD')
+    def create_admin_command(username, password):
+        """Create an admin account, or reset the password of an existing one."""
+        user = User.query.filter_by(username=username).first()
+        if user is not None and user.role != RoleEnum.ADMIN:
+            raise click.ClickException(f'{username} exists and is not an admin.')
+        hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+        if user is None:
+            db.session.add(User(username=username, password=hashed_password, role=RoleEnum.ADMIN))
+        else:
+            user.password = hashed_password
+        db.session.commit()
+        click.echo(f'Admin {username} {"created" if user is None else "updated"}.')
+
+    @app.cli.command('db-upgrade')
+    @click.option('--to', 'target', help='Stop after this version, e.g. 0001.')
+    def db_upgrade_command(target):
+        """Apply pending schema migrations from migrations/."""
+        db.create_all()  # New tables; the migrations change existing ones
+        applied = upgrade(target)
+        for migration in applied:
+            click.echo(f'Applied {migration.version} {migration.name}.')
+        click.echo(f'Applied {len(applied)} migrations.' if applied else 'Database is up to date.')
+
+    @app.cli.command('db-status')
+    def db_status_command():
+        """List the schema migrations and whether each has been applied."""
+        pending = {migration.version for migration in pending_migrations()}
+        for migration in discover_migrations():
+            state = 'pending' if migration.version in pending else 'applied'
+            click.echo(f'{migration.version} {migration.name}: {state}')
+
+    @app.cli.command('db-check-plans')
+    def db_check_plans_command():
+        """EXPLAIN the hot route queries and fail if one does not use its index."""
+        if db.engine.dialect.name != 'sqlite':
+            raise click.ClickException('The query plan check runs on SQLite only.')
+        failed = 0
+        for check in check_query_plans():
+            failed += not check.ok
+            click.echo(f"{'ok  ' if check.ok else 'FAIL'} {check.name}")
+            for line in check.plan:
+                click.echo(f'       {line}')
+        if failed:
+            raise click.ClickException(f'{failed} queries do not use their index.')
+
+    @app.cli.command('rebuild-quiz-results')
+    def rebuild_quiz_results_command():
+        """Recompute every QuizResult from the per-question QuizSubmission grades."""
+        count = rebuild_quiz_results()
+        db.session.commit()
+        click.echo(f'Rebuilt {count} quiz results.')
+
+    @app.cli.command('counters-reconcile')
+    def counters_reconcile_command():
+        """Recompute the dashboard counters, lesson progress and unread notices from the source tables and fix any that drifted."""
+        fixed = reconcile_counters()
+        fixed['enrollment'] = reconcile_progress() + reconcile_unread()
+        db.session.commit()
+        for table, count in fixed.items():
+            click.echo(f'Fixed {count} {table} rows.')
+
+    @app.cli.command('lessons-render')
+    @click.option('--batch-size', default=200, show_default=True, help='Lessons rendered per transaction.')
+    @click.option('--all', 'render_all', is_flag=True, help='Re-render lessons that already have HTML.')
+    def lessons_render_command(batch_size, render_all):
+        """Render the stored HTML of lessons saved before it existed, or of every lesson with --all."""
+        count = backfill_lessons(batch_size=batch_size, force=render_all)
+        click.echo(f'Rendered {count} lessons.')
+
+    @app.cli.command('users-import')
+    @click.argument('source', type=click.File('r', encoding='utf-8-sig'))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+    @click.option('--chunk-size', type=int, help='Rows per transaction (IMPORT_CHUNK_SIZE).')
+    @click.option('--workers', type=int, help='Password hashing processes (IMPORT_HASH_WORKERS).')
+    def users_import_command(source, fmt, chunk_size, workers):
+        """Create users, and student enrollments, from a CSV or JSONL file ('-' for stdin)."""
+        fmt = fmt or ('jsonl' if source.name.endswith(('.jsonl', '.ndjson')) else 'csv')
+        report = import_users(
+            source,
+            fmt,
+            chunk_size=chunk_size or app.config['IMPORT_CHUNK_SIZE'],
+            workers=workers or app.config['IMPORT_HASH_WORKERS']
+        )
+        for error in report.errors:
+            click.echo(f'line {error.line} ({error.username or "-"}): {error.message}', err=True)
+        click.echo(f'Created {report.created} users and {report.enrolled} enrollments, rejected {len(report.errors)} rows.')
+
+    @app.cli.command('search-rebuild')
+    def search_rebuild_command():
+        """Rebuild the full-text search index from existing courses, lessons and notices."""
+        counts = rebuild_search_index()
+        db.session.commit()
+        if not counts:
+            click.echo('Full-text search needs SQLite; nothing was indexed.')
+        for kind, count in counts.items():
+            click.echo(f'Indexed {count} {kind} entries.')
+
+    @app.cli.command('uploads-cleanup')
+    def uploads_cleanup_command():
+        """Discard chunked upload sessions that have been idle for longer than UPLOAD_SESSION_TTL."""
+        folder = staging_folder(app.config['BLOB_FOLDER'])
+        count = expire_sessions(app.config['UPLOAD_SESSION_TTL'], folder)
+        db.session.commit()
+        click.echo(f'Discarded {count} stale upload sessions.')
+
+    @app.cli.command('blobs-gc')
+    def blobs_gc_command():
+        """Recount blob references and delete stored files nothing refers to any more."""
+        recount_references()
+        db.session.commit()
+        count = collect_garbage(app.config['BLOB_FOLDER'])
+        click.echo(f'Deleted {count} unreferenced blobs.')
+
+    @app.cli.command('blobs-import-legacy')
+    def blobs_import_legacy_command():
+        """Copy materials and submissions saved by filename into the content-addressed store."""
+        sources = [
+            (CourseMaterial, 'filename', app.config['UPLOAD_FOLDER']),
+            (Submission, 'submission_file', app.config['SUBMISSIONS_FOLDER']),
+        ]
+        imported = missing = 0
+        for model, column, folder in sources:
+            for row in model.query.filter(model.blob_sha256.is_(None)).all():
+                path = os.path.join(folder, getattr(row, column))
+                if not os.path.isfile(path):
+                    missing += 1
+                    continue
+                with open(path, 'rb') as legacy_file:
+                    row.blob_sha256 = add_stream(app.config['BLOB_FOLDER'], legacy_file).sha256
+                db.session.commit()
+                imported += 1
+        click.echo(f'Imported {imported} files into the blob store, {missing} missing on disk.')
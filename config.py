@@ -2,11 +2,101 @@ import os
 
 class Config:
     SECRET_KEY = 'you-will-never-guess'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///lms.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///lms.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # database pool of each worker process; size it to the worker's thread count
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 30 * 60))
+
+    # views marked @read_only query a separate pool: DATABASE_READ_URL (e.g. a replica),
+    # or with SQLITE_READ_POOL=1 query-only connections to the same SQLite file
+    DATABASE_READ_URL = os.environ.get('DATABASE_READ_URL') or None
+    SQLITE_READ_POOL = os.environ.get('SQLITE_READ_POOL', '0') == '1'
+    DB_READ_POOL_SIZE = int(os.environ.get('DB_READ_POOL_SIZE', 10))
+
+    # SQLite pragmas set on every new connection; WAL lets readers run alongside a writer
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # Milliseconds to wait for a lock
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
     # other config variables
     UPLOAD_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'uploads')
+    SUBMISSIONS_FOLDER = os.path.join(UPLOAD_FOLDER, 'submissions')
+    BLOB_FOLDER = os.path.join(UPLOAD_FOLDER, 'blobs')  # Content-addressed store for new uploads
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # Max file size: 100MB
 
+    # chunked uploads: files up to UPLOAD_MAX_FILE_SIZE arrive in UPLOAD_CHUNK_SIZE pieces
+    UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+    UPLOAD_MAX_FILE_SIZE = 2 * 1024 * 1024 * 1024
+    UPLOAD_SESSION_TTL = 24 * 60 * 60  # Idle sessions older than this are discarded
+
+    # material downloads: None streams through Flask, 'x-accel-redirect' (nginx)
+    # or 'x-sendfile' (Apache/lighttpd) hand the transfer to the front proxy
+    MATERIAL_OFFLOAD = os.environ.get('MATERIAL_OFFLOAD') or None
+    MATERIAL_ACCEL_PREFIX = '/protected-uploads/'  # Internal location mapped to UPLOAD_FOLDER
+    BLOB_ACCEL_PREFIX = '/protected-blobs/'  # Internal location mapped to BLOB_FOLDER
+
+    # fragment cache: 'memory' (per-process LRU), 'sqlite' (shared by the workers on a host) or None
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory') or None
+    CACHE_MAX_BYTES = 64 * 1024 * 1024
+    CACHE_SQLITE_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'fragment_cache.db')
+    CACHE_DEFAULT_TTL = 60 * 60
+
+    # per-process cache of logged-in users; other workers see role changes after USER_CACHE_TTL seconds
+    USER_CACHE_SIZE = 10000
+    USER_CACHE_TTL = 60
+
+    # SQL profiling (opt-in): query count and DB time per request in the X-DB-Profile header,
+    # statements repeated SQL_REPEAT_THRESHOLD times flagged as N+1, slow statements logged
+    SQL_PROFILING = os.environ.get('SQL_PROFILING', '0') == '1'
+    SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 100))
+    SQL_REPEAT_THRESHOLD = 5
+    SQL_SLOW_QUERY_LOG_SIZE = 100
+
+    # Prometheus metrics on /metrics. With several worker processes set METRICS_DIR to a directory
+    # they share (emptied at deploy); each writes its totals there and a scrape adds them up
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_DIR = os.environ.get('METRICS_DIR') or None
+    METRICS_FLUSH_INTERVAL = 1.0  # Seconds between writes of a worker's file
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None  # If set, scrapes send 'Authorization: Bearer <token>'
+
+    # notices pushed to students over Server-Sent Events. An open stream holds its worker, so enable it
+    # only when serving the app with an async worker (e.g. gunicorn -k gevent); otherwise the stream
+    # answers 204 and the badge updates on page loads. Each worker process polls for new notices every
+    # NOTICE_POLL_INTERVAL seconds
+    NOTICE_STREAM_ENABLED = os.environ.get('NOTICE_STREAM_ENABLED', '0') == '1'
+    NOTICE_POLL_INTERVAL = float(os.environ.get('NOTICE_POLL_INTERVAL', 2.0))
+    NOTICE_HEARTBEAT = 15  # Seconds between keep-alive comments on an idle stream
+    NOTICE_STREAM_TIMEOUT = 5 * 60  # Streams end after this and the browser reconnects
+    NOTICE_RETRY_MS = 3000  # Reconnection delay sent to the browser
+    NOTICE_QUEUE_SIZE = 100  # Events buffered per stream; a stream that falls further behind is ended
+    NOTICE_REPLAY_LIMIT = 100  # Missed notices sent on reconnect
+
+    # bulk user import: rows per transaction and password hashing processes (None = all CPUs)
+    IMPORT_CHUNK_SIZE = 1000
+    IMPORT_HASH_WORKERS = None
+
+    # bulk enrollment: rows per transaction and students per request
+    ENROLL_CHUNK_SIZE = 1000
+    ENROLL_MAX_ROWS = 50_000
+
+    # gradebook exports: rows fetched per round trip and encoded per chunk of the download
+    EXPORT_BATCH_SIZE = 1000
+
+    # pagination
+    PER_PAGE = 20
+    MAX_PER_PAGE = 100
+    STUDENTS_PER_PAGE = 50
+    SUBMISSIONS_PER_PAGE = 25
+
+    # quiz answer normalization
+    QUIZ_CASE_SENSITIVE = False
+    QUIZ_COLLAPSE_WHITESPACE = True
+    QUIZ_NUMERIC_TOLERANCE = 0.0
+
     
\ No newline at end of file
@@ -0,0 +1,227 @@
+# counters.py
+"""Denormalized dashboard counters: CourseStats per course and InstructorStats per instructor.
+
+Code that adds or removes counted rows calls the matching function here in the
+same transaction, so a counter changes exactly when its rows do. The caller
+commits. reconcile_counters() recomputes every counter from the source tables
+(flask counters-reconcile) to repair drift.
+"""
+
+from collections import Counter
+
+from sqlalchemy import bindparam, distinct, func
+
+from extensions import db, insert_ignore
+from models import Course, CourseStats, Enrollment, Instructor, InstructorStats, Lesson, Quiz, Submission
+from notices import enrollments_added as unread_notices_added
+
+COURSE_COUNTERS = ('enrolled_students', 'lessons', 'active_quizzes', 'inactive_quizzes', 'ungraded_submissions')
+INSTRUCTOR_COUNTERS = ('courses', 'enrolled_students', 'active_quizzes', 'inactive_quizzes', 'ungraded_submissions')
+
+
+def quiz_counter(status):
+    """Name of the counter a quiz with this status is counted in."""
+    return 'active_quizzes' if status == 'Active' else 'inactive_quizzes'
+
+
+def _key(model):
+    return next(iter(model.__table__.primary_key.columns))
+
+
+def _add(model, deltas):
+    """Add {row id: {counter: delta}} to the counter rows of ``model``, creating missing rows."""
+    table, key = model.__table__, _key(model)
+    deltas = {row_id: changes for row_id, changes in deltas.items() if any(changes.values())}
+    insert_ignore(model, [{key.name: row_id} for row_id in deltas])
+    for row_id, changes in deltas.items():
+        db.session.execute(
+            table.update()
+            .where(key == row_id)
+            .values({name: table.c[name] + delta for name, delta in changes.items() if delta})
+        )
+
+
+def _instructor_of(course_id):
+    return db.session.get(Course, course_id).instructor_id
+
+
+def course_created(course):
+    """Create the counters of a new course and count it for its instructor."""
+    insert_ignore(CourseStats, [{'course_id': course.id}])
+    _add(InstructorStats, {course.instructor_id: {'courses': 1}})
+
+
+def course_deleted(course):
+    """Drop a course's counters and take them off its instructor's; call before deleting the course."""
+    stats = db.session.get(CourseStats, course.id)
+    changes = {'courses': -1}
+    if stats is not None:
+        changes.update({name: -getattr(stats, name) for name in ('active_quizzes', 'inactive_quizzes', 'ungraded_submissions')})
+        db.session.delete(stats)
+    _add(InstructorStats, {course.instructor_id: changes})
+
+    # Students are counted once per instructor, so recount those left in the other courses
+    remaining = db.session.execute(
+        db.select(func.count(distinct(Enrollment.student_id)))
+        .join(Course, Course.id == Enrollment.course_id)
+        .where(Course.instructor_id == course.instructor_id, Course.id != course.id)
+    ).scalar()
+    db.session.execute(
+        db.update(InstructorStats)
+        .where(InstructorStats.instructor_id == course.instructor_id)
+        .values(enrolled_students=remaining)
+    )
+
+
+def enrollments_added(pairs):
+    """Count new (student_id, course_id) enrollments, and the course notices they have not read; call after inserting them.
+
+    An instructor's student count only grows for students who had no other
+    enrollment in that instructor's courses.
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return
+    courses = Counter(course_id for _, course_id in pairs)
+    instructors = dict(db.session.execute(
+        db.select(Course.id, Course.instructor_id).where(Course.id.in_(courses))
+    ).all())
+    new = Counter((student_id, instructors[course_id]) for student_id, course_id in pairs)
+
+    totals = db.session.execute(
+        db.select(Enrollment.student_id, Course.instructor_id, func.count())
+        .join(Course, Course.id == Enrollment.course_id)
+        .where(
+            Enrollment.student_id.in_({student_id for student_id, _ in pairs}),
+            Course.instructor_id.in_(set(instructors.values()))
+        )
+        .group_by(Enrollment.student_id, Course.instructor_id)
+    )
+    first_enrollments = Counter(
+        instructor_id for student_id, instructor_id, total in totals if total == new[(student_id, instructor_id)]
+    )
+
+    _add(CourseStats, {course_id: {'enrolled_students': n} for course_id, n in courses.items()})
+    _add(InstructorStats, {instructor_id: {'enrolled_students': n} for instructor_id, n in first_enrollments.items()})
+    unread_notices_added(pairs)
+
+
+def lessons_changed(course_id, delta):
+    """Add ``delta`` to a course's lesson count; returns the new count."""
+    _add(CourseStats, {course_id: {'lessons': delta}})
+    return db.session.execute(db.select(CourseStats.lessons).where(CourseStats.course_id == course_id)).scalar() or 0
+
+
+def quiz_added(quiz):
+    """Count a new quiz under its status."""
+    changes = {quiz_counter(quiz.status): 1}
+    _add(CourseStats, {quiz.course_id: changes})
+    _add(InstructorStats, {_instructor_of(quiz.course_id): changes})
+
+
+def submission_added(submission):
+    """Count a new assignment submission as ungraded until it has a grade."""
+    if submission.grade is None:
+        changes = {'ungraded_submissions': 1}
+        _add(CourseStats, {submission.course_id: changes})
+        _add(InstructorStats, {_instructor_of(submission.course_id): changes})
+
+
+def instructor_stats(instructor_id):
+    """The counters of an instructor; all zero if nothing was counted yet."""
+    stats = db.session.get(InstructorStats, instructor_id)
+    if stats is None:
+        stats = InstructorStats(instructor_id=instructor_id, **dict.fromkeys(INSTRUCTOR_COUNTERS, 0))
+    return stats
+
+
+def course_stats(course_ids):
+    """The counters of the given courses, by course id; missing courses are left out."""
+    if not course_ids:
+        return {}
+    rows = db.session.execute(db.select(CourseStats).where(CourseStats.course_id.in_(course_ids))).scalars()
+    return {stats.course_id: stats for stats in rows}
+
+
+# Reconciliation
+
+def expected_counters(executor):
+    """Compute every counter from the source tables: ({course id: counters}, {instructor id: counters})."""
+    course_owner = dict(executor.execute(db.select(Course.id, Course.instructor_id)).all())
+    courses = {course_id: dict.fromkeys(COURSE_COUNTERS, 0) for course_id in course_owner}
+    instructors = {
+        instructor_id: dict.fromkeys(INSTRUCTOR_COUNTERS, 0)
+        for instructor_id in executor.execute(db.select(Instructor.id)).scalars()
+    }
+
+    for course_id, n in executor.execute(db.select(Enrollment.course_id, func.count()).group_by(Enrollment.course_id)):
+        if course_id in courses:
+            courses[course_id]['enrolled_students'] = n
+    for course_id, n in executor.execute(db.select(Lesson.course_id, func.count()).group_by(Lesson.course_id)):
+        if course_id in courses:
+            courses[course_id]['lessons'] = n
+    for course_id, status, n in executor.execute(db.select(Quiz.course_id, Quiz.status, func.count()).group_by(Quiz.course_id, Quiz.status)):
+        if course_id in courses:
+            courses[course_id][quiz_counter(status)] += n
+    for course_id, n in executor.execute(
+        db.select(Submission.course_id, func.count()).where(Submission.grade.is_(None)).group_by(Submission.course_id)
+    ):
+        if course_id in courses:
+            courses[course_id]['ungraded_submissions'] = n
+
+    for course_id, instructor_id in course_owner.items():
+        totals = instructors.setdefault(instructor_id, dict.fromkeys(INSTRUCTOR_COUNTERS, 0))
+        totals['courses'] += 1
+        for name in ('active_quizzes', 'inactive_quizzes', 'ungraded_submissions'):
+            totals[name] += courses[course_id][name]
+    for instructor_id, n in executor.execute(
+        db.select(Course.instructor_id, func.count(distinct(Enrollment.student_id)))
+        .join(Enrollment, Enrollment.course_id == Course.id)
+        .group_by(Course.instructor_id)
+    ):
+        instructors[instructor_id]['enrolled_students'] = n
+    return courses, instructors
+
+
+def _sync(executor, model, expected):
+    """Make the rows of ``model`` equal ``expected``; returns how many rows were changed.
+
+    A missing row reads as all zeros, so none is inserted where every counter is zero.
+    """
+    table, key = model.__table__, _key(model)
+    stored = {row[key.name]: row for row in executor.execute(table.select()).mappings()}
+    inserts = [
+        {key.name: row_id, **counters} for row_id, counters in expected.items()
+        if row_id not in stored and any(counters.values())
+    ]
+    updates = [
+        {'row_id': row_id, **{f'new_{name}': value for name, value in counters.items()}}
+        for row_id, counters in expected.items()
+        if row_id in stored and any(stored[row_id][name] != value for name, value in counters.items())
+    ]
+    deletes = [row_id for row_id in stored if row_id not in expected]
+
+    if inserts:
+        executor.execute(table.insert(), inserts)
+    if updates:
+        names = next(iter(expected.values())).keys()
+        executor.execute(
+            table.update().where(key == bindparam('row_id')).values({name: bindparam(f'new_{name}') for name in names}),
+            updates
+        )
+    if deletes:
+        executor.execute(table.delete().where(key.in_(deletes)))
+    return len(inserts) + len(updates) + len(deletes)
+
+
+def reconcile_counters(executor=None):
+    """Recompute every counter and fix the rows that drifted; returns the rows fixed per table.
+
+    ``executor`` is the session (default) or a connection, e.g. in a migration.
+    """
+    executor = executor or db.session
+    courses, instructors = expected_counters(executor)
+    return {
+        'course_stats': _sync(executor, CourseStats, courses),
+        'instructor_stats': _sync(executor, InstructorStats, instructors),
+    }
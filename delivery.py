@@ -0,0 +1,78 @@
+# delivery.py
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import lru_cache
+from urllib.parse import quote
+
+from flask import abort, current_app, request
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+# Read files in 1 MB blocks when hashing them
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@lru_cache(maxsize=4096)
+def _content_digest(path, mtime_ns, size):
+    """Hash a file's content; cached until the file's mtime or size changes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as stored:
+        for chunk in iter(lambda: stored.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_etag(path, stat=None):
+    """Return a strong ETag value derived from the SHA-256 of the file content."""
+    stat = stat or os.stat(path)
+    return _content_digest(path, stat.st_mtime_ns, stat.st_size)
+
+
+def send_stored_file(directory, filename, download_name=None, etag=None, accel_prefix=None):
+    """Send a stored upload as an attachment with Range and conditional GET support.
+
+    With MATERIAL_OFFLOAD set to 'x-accel-redirect' or 'x-sendfile', only the
+    headers are produced and the front proxy streams the file itself from
+    ``accel_prefix`` (MATERIAL_ACCEL_PREFIX by default). ``etag`` may be
+    passed when the content hash is already known.
+    """
+    path = safe_join(directory, filename)
+    if path is None:
+        abort(404)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        abort(404)
+
+    etag = etag or content_etag(path, stat)
+    last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+    download_name = download_name or os.path.basename(filename)
+    offload = current_app.config.get('MATERIAL_OFFLOAD')
+
+    if offload == 'x-accel-redirect':
+        # nginx serves the internal location, including ranges, once we return
+        response = current_app.response_class(status=200)
+        accel_prefix = accel_prefix or current_app.config['MATERIAL_ACCEL_PREFIX']
+        internal_uri = accel_prefix.rstrip('/') + '/' + quote(filename.replace(os.sep, '/'))
+        response.headers['X-Accel-Redirect'] = internal_uri
+        response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        return response
+
+    response = send_file(
+        path,
+        request.environ,
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True,  # Handles Range, If-Range, If-None-Match and If-Modified-Since
+        etag=etag,
+        last_modified=last_modified,
+        max_age=0,
+        use_x_sendfile=offload == 'x-sendfile',  # Apache/lighttpd stream the file named in X-Sendfile
+        response_class=current_app.response_class
+    )
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
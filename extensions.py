@@ -1,4 +1,141 @@
 # extensions.py
+import importlib
+from functools import wraps
+
+from flask import g, has_request_context
+from flask_login import LoginManager
 from flask_sqlalchemy import SQLAlchemy
+from flask_wtf.csrf import CSRFProtect
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from cache import FragmentCache
+
+
+class RoutingSession(Session):
+    """Session that sends the SELECTs of views marked @read_only to the 'read' bind, if configured.
+
+    Flushes, writes and everything outside those views use the primary engine.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if (
+            bind is None
+            and not self._flushing
+            and getattr(clause, 'is_select', False)
+            and has_request_context()
+            and g.get('read_only_db')
+        ):
+            engines = self._db.engines
+            if engine is engines.get(None) and 'read' in engines:
+                return engines['read']
+        return engine
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+csrf = CSRFProtect()
+login_manager = LoginManager()
+login_manager.login_view = 'public.login'  # Redirect to login page if not authenticated
+login_manager.blueprint_login_views['api'] = None  # The API answers 401 instead
+fragment_cache = FragmentCache()
+
+
+def read_only(view):
+    """Mark a view as read-only so its queries may use the read pool."""
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        g.read_only_db = True
+        return view(*args, **kwargs)
+    return decorated_function
+
+
+def insert_ignore(model, rows, returning=None):
+    """Insert rows, skipping any that conflict with a primary key or unique constraint.
+
+    Returns the number of rows inserted, or with ``returning`` (a list of
+    columns) those columns of each inserted row. Uses ON CONFLICT DO NOTHING
+    on SQLite and PostgreSQL and INSERT IGNORE on MySQL, which cannot return rows.
+    """
+    if not rows:
+        return 0 if returning is None else []
+    table = model.__table__
+    dialect = db.session.get_bind(mapper=model.__mapper__).dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = importlib.import_module(f'sqlalchemy.dialects.{dialect}').insert
+        statement = dialect_insert(table).on_conflict_do_nothing()
+    elif dialect in ('mysql', 'mariadb') and returning is None:
+        statement = table.insert().prefix_with('IGNORE')
+    else:
+        raise NotImplementedError(f'insert_ignore does not support {dialect}' + (' with returning' if returning is not None else ''))
+    if returning is not None:
+        return db.session.execute(statement.returning(*returning), rows).all()
+    return db.session.execute(statement, rows).rowcount
+
+
+def _is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def _pool_options(url, config, pool_size):
+    """Pool sizing for an engine; in-memory SQLite keeps its single static connection."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == 'sqlite' and parsed.database in (None, '', ':memory:'):
+        return {}
+    return {
+        'pool_size': pool_size,
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': not _is_sqlite(url),  # Server databases drop idle connections
+    }
+
+
+def _sqlite_pragmas(config, read_only_connection):
+    """Return a connect listener applying the SQLITE_* settings to every new connection."""
+    pragmas = [
+        f"busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT'])}",
+        f"synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        f"cache_size = -{int(config['SQLITE_CACHE_SIZE_KB'])}",  # Negative means KiB rather than pages
+        f"mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+        f"journal_mode = {config['SQLITE_JOURNAL_MODE']}" if not read_only_connection else None,
+        'query_only = ON' if read_only_connection else None,
+    ]
+
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            if pragma:
+                cursor.execute(f'PRAGMA {pragma}')
+        cursor.close()
+
+    return apply_pragmas
+
+
+def init_database(app):
+    """Configure the engines from the DB_* and SQLITE_* settings and bind db to the app.
+
+    The 'read' bind is DATABASE_READ_URL when set (e.g. a replica), or with
+    SQLITE_READ_POOL a second, query-only pool on the primary SQLite file.
+    """
+    config = app.config
+    url = config['SQLALCHEMY_DATABASE_URI']
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    for key, value in _pool_options(url, config, config['DB_POOL_SIZE']).items():
+        options.setdefault(key, value)
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    read_url = config.get('DATABASE_READ_URL') or (url if config.get('SQLITE_READ_POOL') and _is_sqlite(url) else None)
+    if read_url:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds['read'] = {'url': read_url, **_pool_options(read_url, config, config['DB_READ_POOL_SIZE'])}
+        config['SQLALCHEMY_BINDS'] = binds
+
+    db.init_app(app)
 
-db = SQLAlchemy()
\ No newline at end of file
+    # Engines exist after init_app but have not connected yet, so every connection gets the pragmas
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _sqlite_pragmas(config, read_only_connection=bind_key == 'read'))
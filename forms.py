@@ -1,12 +1,15 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField, SelectField, TextAreaField, FileField, BooleanField, FieldList, FormField
 from wtforms.validators import DataRequired, EqualTo, ValidationError, Length
-from models import User
+from models import User, RoleEnum as UserRole
 from enum import Enum
 from flask_wtf.file import FileAllowed
 from flask import request
 
 
+# File types accepted as course materials
+ALLOWED_MATERIAL_EXTENSIONS = ['pdf', 'docx', 'pptx']
+
 class RoleEnum(Enum):
     STUDENT = 'student'
     INSTRUCTOR = 'instructor'
@@ -25,6 +28,27 @@ class RegistrationForm(FlaskForm):
         if user:
             raise ValidationError('That username is already taken.')
 
+class EditUserForm(FlaskForm):
+    """Form for an admin to rename a user or change their role."""
+    username = StringField('Username', validators=[DataRequired(), Length(min=3, max=150)])
+    role = SelectField('Role', choices=[(role.value, role.name.capitalize()) for role in UserRole], validators=[DataRequired()])
+    submit = SubmitField('Save User')
+
+    def __init__(self, *args, obj=None, **kwargs):
+        super().__init__(*args, obj=obj, **kwargs)
+        self.user_id = obj.id if obj is not None else None
+
+    def validate_username(self, username):
+        """Validate that no other user has this username."""
+        user = User.query.filter_by(username=username.data).first()
+        if user and user.id != self.user_id:
+            raise ValidationError('That username is already taken.')
+
+class ImportUsersForm(FlaskForm):
+    """Form for uploading a CSV or JSONL file of users to create."""
+    source = FileField('Users File', validators=[DataRequired(), FileAllowed(['csv', 'jsonl', 'ndjson'], 'CSV or JSONL files only!')])
+    submit = SubmitField('Import Users')
+
 class LoginForm(FlaskForm):
     """Form for user login."""
     username = StringField('Username', validators=[DataRequired()])
@@ -44,7 +68,7 @@ class EnrollCourseForm(FlaskForm):
 
 class UploadMaterialForm(FlaskForm):
     course = SelectField('Course', coerce=int, validators=[DataRequired()])
-    material = FileField('Course Material', validators=[DataRequired(), FileAllowed(['pdf', 'docx', 'pptx'], 'Documents only!')])
+    material = FileField('Course Material', validators=[DataRequired(), FileAllowed(ALLOWED_MATERIAL_EXTENSIONS, 'Documents only!')])
     submit = SubmitField('Upload Material')
 
 class LessonForm(FlaskForm):
@@ -57,6 +81,10 @@ class DeleteLessonForm(FlaskForm):
     """Form for deleting a lesson."""
     submit = SubmitField('Delete Lesson')
 
+class CompleteLessonForm(FlaskForm):
+    """Form for marking a lesson as complete."""
+    submit = SubmitField('Mark as Complete')
+
 class QuestionForm(FlaskForm):
     """Form for creating a question."""
     question_text = TextAreaField('Question', validators=[DataRequired()])
@@ -72,7 +100,7 @@ class QuizForm(FlaskForm):
  
     # Accept the extra_validators argument
     def validate(self, extra_validators=None):
-        if request.endpoint == 'submit_quiz':  # Only validate answers when submitting the quiz
+        if request.endpoint == 'student.submit_quiz':  # Only validate answers when submitting the quiz
             for question in self.questions:
                 if not question.answer.data:
                     self.errors['questions'] = [{'answer': ['This field is required.']}]
@@ -84,6 +112,7 @@ class QuizForm(FlaskForm):
 
 
 class NoticeForm(FlaskForm):
+    course = SelectField('Course', coerce=int, validators=[DataRequired()])
     title = StringField('Title', validators=[DataRequired()])
     content = TextAreaField('Content', validators=[DataRequired()])
     submit = SubmitField('Post Notice')
\ No newline at end of file
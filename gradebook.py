@@ -0,0 +1,216 @@
+# gradebook.py
+"""Gradebook exports as CSV or XLSX, generated row by row.
+
+Rows come from column-only queries executed with yield_per, so the database
+driver streams them and the session keeps no objects; the writers hand back
+encoded chunks as they fill. Memory stays flat however many rows a course has,
+and the first chunk is sent before the last row is read.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from sqlalchemy import literal
+
+from extensions import db
+from models import Question, Quiz, QuizResult, QuizSubmission, Student, Submission, User
+
+COURSE_COLUMNS = ['Student ID', 'Username', 'Type', 'Item', 'Score', 'Max score', 'Submitted at']
+QUIZ_COLUMNS = ['Student ID', 'Username', 'Question ID', 'Question', 'Answer', 'Grade', 'Submitted at']
+
+# Rows per worksheet, below Excel's limit of 1,048,576 including the header
+XLSX_MAX_ROWS = 1_000_000
+
+
+def _stream(statement, batch_size):
+    """Execute a query, fetching ``batch_size`` rows at a time from a server-side cursor."""
+    yield from db.session.execute(statement, execution_options={'yield_per': batch_size})
+
+
+def course_rows(course_id, batch_size=1000):
+    """Quiz results, then assignment submissions, of every student of a course."""
+    # In index order (quiz, result id), so the database need not sort before the first row
+    yield from _stream(
+        db.select(QuizResult.student_id, User.username, literal('Quiz'), Quiz.title,
+                  QuizResult.score, QuizResult.max_score, QuizResult.submitted_at)
+        .join(Quiz, Quiz.id == QuizResult.quiz_id)
+        .join(Student, Student.id == QuizResult.student_id)
+        .join(User, User.id == Student.id)
+        .where(Quiz.course_id == course_id)
+        .order_by(QuizResult.quiz_id, QuizResult.id),
+        batch_size
+    )
+    yield from _stream(
+        db.select(Submission.student_id, User.username, literal('Assignment'), Submission.submission_file,
+                  Submission.grade, literal(None), Submission.submission_date)
+        .join(Student, Student.id == Submission.student_id)
+        .join(User, User.id == Student.id)
+        .where(Submission.course_id == course_id)
+        .order_by(Submission.id),
+        batch_size
+    )
+
+
+def quiz_rows(quiz_id, batch_size=1000):
+    """Every answer given to a quiz, grouped by student."""
+    yield from _stream(
+        db.select(QuizSubmission.student_id, User.username, QuizSubmission.question_id, Question.question_text,
+                  QuizSubmission.selected_answer, QuizSubmission.grade, QuizSubmission.submission_date)
+        .join(Question, Question.id == QuizSubmission.question_id)
+        .join(Student, Student.id == QuizSubmission.student_id)
+        .join(User, User.id == Student.id)
+        .where(QuizSubmission.quiz_id == quiz_id)
+        .order_by(QuizSubmission.student_id, QuizSubmission.id),
+        batch_size
+    )
+
+
+# CSV
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ', timespec='seconds')
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        return "'" + value  # Keep spreadsheets from running answers as formulas
+    return value
+
+
+def csv_chunks(columns, rows, chunk_rows=1000):
+    """Encode rows as UTF-8 CSV (with a BOM, for Excel), yielding every ``chunk_rows`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for n, row in enumerate(rows, 1):
+        writer.writerow([_csv_value(value) for value in row])
+        if n % chunk_rows == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+# XLSX
+
+class _Sink:
+    """A write-only file that collects what the zip writer produces until it is taken."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value!r}</v></c>'
+    if isinstance(value, datetime):
+        value = value.isoformat(sep=' ', timespec='seconds')
+    text = escape(_INVALID_XML.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return ('<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>').encode('utf-8')
+
+
+def _xlsx_package(sheets):
+    """The workbook, relationship and content-type parts for ``sheets`` worksheets."""
+    names = [f'Grades {n}' if sheets > 1 else 'Grades' for n in range(1, sheets + 1)]
+    workbook = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheets>'
+        + ''.join(f'<sheet name="{name}" sheetId="{n}" r:id="rId{n}"/>' for n, name in enumerate(names, 1))
+        + '</sheets></workbook>'
+    )
+    workbook_rels = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{_PACKAGE_REL_NS}">'
+        + ''.join(f'<Relationship Id="rId{n}" Type="{_REL_NS}/worksheet" Target="worksheets/sheet{n}.xml"/>' for n in range(1, sheets + 1))
+        + '</Relationships>'
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        + ''.join(f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+                  'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>' for n in range(1, sheets + 1))
+        + '</Types>'
+    )
+    root_rels = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{_PACKAGE_REL_NS}">'
+        f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'
+    )
+    return [('xl/workbook.xml', workbook), ('xl/_rels/workbook.xml.rels', workbook_rels),
+            ('[Content_Types].xml', content_types), ('_rels/.rels', root_rels)]
+
+
+def _start_sheet(package, number, header):
+    sheet = package.open(f'xl/worksheets/sheet{number}.xml', 'w', force_zip64=True)  # Size unknown until the end
+    sheet.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<worksheet xmlns="{_MAIN_NS}"><sheetData>'.encode())
+    sheet.write(header)
+    return sheet
+
+
+def _end_sheet(sheet):
+    sheet.write(b'</sheetData></worksheet>')
+    sheet.close()
+
+
+def xlsx_chunks(columns, rows, chunk_rows=1000):
+    """Encode rows as an XLSX workbook, yielding the zip bytes every ``chunk_rows`` rows.
+
+    The zip is written to a stream that cannot seek, so each part carries its
+    sizes after its data and nothing is held back. A new worksheet starts every
+    XLSX_MAX_ROWS rows; the parts naming the worksheets are written last.
+    """
+    sink = _Sink()
+    header = _xlsx_row(columns)
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as package:
+        sheets, sheet_rows = 1, 0
+        sheet = _start_sheet(package, sheets, header)
+        for n, row in enumerate(rows, 1):
+            if sheet_rows == XLSX_MAX_ROWS:
+                _end_sheet(sheet)
+                sheets, sheet_rows = sheets + 1, 0
+                sheet = _start_sheet(package, sheets, header)
+            sheet.write(_xlsx_row(row))
+            sheet_rows += 1
+            if n % chunk_rows == 0:
+                yield sink.take()
+        _end_sheet(sheet)
+        for name, content in _xlsx_package(sheets):
+            package.writestr(name, content)
+    yield sink.take()
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_chunks, 'text/csv'),
+    'xlsx': (xlsx_chunks, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
@@ -0,0 +1,203 @@
+# grading.py
+
+import math
+import re
+from collections import namedtuple
+
+from sqlalchemy import func, cast, Float
+
+from extensions import db
+from models import Question, QuizSubmission, QuizResult
+
+# One question of a quiz as needed for rendering and grading
+AnswerKeyEntry = namedtuple('AnswerKeyEntry', ['question_id', 'question_text', 'correct_answer'])
+
+# Outcome of grading one submitted answer vector
+GradingResult = namedtuple('GradingResult', ['score', 'max_score', 'graded', 'skipped'])
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class AnswerNormalizer:
+    """Compares submitted answers with the correct answer using configurable rules."""
+
+    def __init__(self, case_sensitive=False, collapse_whitespace=True, numeric_tolerance=0.0):
+        self.case_sensitive = case_sensitive
+        self.collapse_whitespace = collapse_whitespace
+        self.numeric_tolerance = numeric_tolerance
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a normalizer from the QUIZ_* settings of the app config."""
+        return cls(
+            case_sensitive=config.get('QUIZ_CASE_SENSITIVE', False),
+            collapse_whitespace=config.get('QUIZ_COLLAPSE_WHITESPACE', True),
+            numeric_tolerance=config.get('QUIZ_NUMERIC_TOLERANCE', 0.0)
+        )
+
+    def normalize(self, value):
+        """Return the canonical text form of an answer."""
+        value = (value or '').strip()
+        if self.collapse_whitespace:
+            value = _WHITESPACE.sub(' ', value)
+        if not self.case_sensitive:
+            value = value.casefold()
+        return value
+
+    def matches(self, correct_answer, selected_answer):
+        """Return True if the selected answer counts as correct."""
+        expected = self.normalize(correct_answer)
+        given = self.normalize(selected_answer)
+        if expected == given:
+            return True
+
+        # Numeric answers are compared by value, e.g. "4" == "4.0"
+        try:
+            expected_number, given_number = float(expected), float(given)
+        except ValueError:
+            return False
+        if not (math.isfinite(expected_number) and math.isfinite(given_number)):
+            return False
+        return math.isclose(expected_number, given_number, rel_tol=0.0, abs_tol=self.numeric_tolerance)
+
+
+def load_answer_key(quiz_id):
+    """Fetch every question of a quiz, in display order, with a single query."""
+    rows = db.session.execute(
+        db.select(Question.id, Question.question_text, Question.correct_answer)
+        .where(Question.quiz_id == quiz_id)
+        .order_by(Question.id)
+    )
+    return [AnswerKeyEntry(*row) for row in rows]
+
+
+def answered_question_ids(student_id, quiz_id):
+    """Return the ids of the questions this student has already answered."""
+    return set(db.session.execute(
+        db.select(QuizSubmission.question_id)
+        .where(QuizSubmission.student_id == student_id, QuizSubmission.quiz_id == quiz_id)
+    ).scalars())
+
+
+def grade_answers(answer_key, selected_answers, normalizer):
+    """Grade an answer vector against the answer key, returning 1/0 per question."""
+    return [
+        1 if normalizer.matches(entry.correct_answer, selected) else 0
+        for entry, selected in zip(answer_key, selected_answers)
+    ]
+
+
+def submit_answers(student_id, quiz_id, selected_answers, normalizer, answer_key=None):
+    """Grade a student's answers and bulk insert them as QuizSubmission rows.
+
+    Questions the student already answered are skipped. The student's
+    QuizResult is updated in the same transaction; the caller owns the
+    transaction and is expected to commit.
+    """
+    if answer_key is None:
+        answer_key = load_answer_key(quiz_id)
+    already_answered = answered_question_ids(student_id, quiz_id)
+    grades = grade_answers(answer_key, selected_answers, normalizer)
+
+    rows = [
+        {
+            'student_id': student_id,
+            'quiz_id': quiz_id,
+            'question_id': entry.question_id,
+            'selected_answer': selected,
+            'grade': str(grade)
+        }
+        for entry, selected, grade in zip(answer_key, selected_answers, grades)
+        if entry.question_id not in already_answered
+    ]
+    score = sum(int(row['grade']) for row in rows)
+    if rows:
+        db.session.execute(db.insert(QuizSubmission), rows)
+        record_result(student_id, quiz_id, score, len(answer_key))
+
+    return GradingResult(
+        score=score,
+        max_score=len(answer_key),
+        graded=len(rows),
+        skipped=len(answer_key) - len(rows)
+    )
+
+
+def record_result(student_id, quiz_id, score, max_score):
+    """Add newly graded points to the student's QuizResult, creating it on the first attempt."""
+    result = QuizResult.query.filter_by(student_id=student_id, quiz_id=quiz_id).first()
+    if result is None:
+        result = QuizResult(student_id=student_id, quiz_id=quiz_id, score=0.0, max_score=max_score)
+        db.session.add(result)
+    result.score += score
+    result.max_score = max_score
+    return result
+
+
+def parse_grade(grade):
+    """Return the numeric value of a stored QuizSubmission grade (None counts as 0)."""
+    try:
+        return float(grade)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def change_grade(submission, new_grade):
+    """Regrade one QuizSubmission and shift its QuizResult by the difference."""
+    delta = parse_grade(new_grade) - parse_grade(submission.grade)
+    submission.grade = str(new_grade)
+    if delta:
+        updated = db.session.execute(
+            db.update(QuizResult)
+            .where(QuizResult.student_id == submission.student_id, QuizResult.quiz_id == submission.quiz_id)
+            .values(score=QuizResult.score + delta)
+        ).rowcount
+        if not updated:
+            # Submissions made before QuizResult existed get their row on first regrade
+            rebuild_quiz_results(student_id=submission.student_id, quiz_id=submission.quiz_id)
+
+
+def rebuild_quiz_results(student_id=None, quiz_id=None, executor=None):
+    """Recompute QuizResult rows from QuizSubmission grades, optionally for one student or quiz.
+
+    Returns the number of results written. The caller is expected to commit.
+    ``executor`` is the session (default) or a connection, e.g. in a migration.
+    """
+    executor = executor or db.session
+    if executor is db.session:
+        db.session.flush()
+    totals = (
+        db.select(
+            QuizSubmission.student_id,
+            QuizSubmission.quiz_id,
+            func.sum(cast(QuizSubmission.grade, Float)).label('score'),
+            func.min(QuizSubmission.submission_date).label('submitted_at')
+        )
+        .group_by(QuizSubmission.student_id, QuizSubmission.quiz_id)
+    )
+    delete = db.delete(QuizResult)
+    if student_id is not None:
+        totals = totals.where(QuizSubmission.student_id == student_id)
+        delete = delete.where(QuizResult.student_id == student_id)
+    if quiz_id is not None:
+        totals = totals.where(QuizSubmission.quiz_id == quiz_id)
+        delete = delete.where(QuizResult.quiz_id == quiz_id)
+
+    question_counts = dict(executor.execute(
+        db.select(Question.quiz_id, func.count(Question.id)).group_by(Question.quiz_id)
+    ).all())
+    rows = [
+        {
+            'student_id': row.student_id,
+            'quiz_id': row.quiz_id,
+            'score': row.score or 0.0,
+            'max_score': question_counts.get(row.quiz_id, 0),
+            'submitted_at': row.submitted_at
+        }
+        for row in executor.execute(totals)
+    ]
+
+    executor.execute(delete)
+    if rows:
+        executor.execute(db.insert(QuizResult), rows)
+    return len(rows)
@@ -0,0 +1,125 @@
+# identity.py
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+
+from extensions import db
+from models import Instructor, Student, User
+
+
+class ProfileRef:
+    """The instructor or student profile of a cached user, holding only its id.
+
+    Reading any other attribute (e.g. ``courses``) loads the profile row.
+    """
+
+    __slots__ = ('model', 'id')
+
+    def __init__(self, model, profile_id):
+        self.model = model
+        self.id = profile_id
+
+    def __getattr__(self, name):
+        return getattr(db.session.get(self.model, self.id), name)
+
+
+class CachedUser(UserMixin):
+    """Compact stand-in for User used as current_user; built from the identity cache."""
+
+    __slots__ = ('id', 'username', 'role', 'instructor_id', 'student_id')
+
+    def __init__(self, user_id, username, role, instructor_id, student_id):
+        self.id = user_id
+        self.username = username
+        self.role = role
+        self.instructor_id = instructor_id
+        self.student_id = student_id
+
+    @property
+    def instructor(self):
+        return ProfileRef(Instructor, self.instructor_id) if self.instructor_id is not None else None
+
+    @property
+    def student(self):
+        return ProfileRef(Student, self.student_id) if self.student_id is not None else None
+
+    def __repr__(self):
+        return f'<User {self.username}>'
+
+
+class IdentityCache:
+    """Per-process LRU of user identities, each kept for at most ``ttl`` seconds.
+
+    Entries are plain tuples (username, role, instructor_id, student_id,
+    expires_at). Changes made by another worker are seen once the TTL runs out.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('USER_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        self.clear()
+        app.extensions['identity_cache'] = self
+
+    def load(self, user_id):
+        """Return the CachedUser for an id, querying the database only on a miss or after expiry."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[4] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return CachedUser(user_id, *entry[:4])
+
+        self.misses += 1
+        # One query for the user and both profile ids
+        row = db.session.execute(
+            db.select(User.username, User.role, Instructor.id, Student.id)
+            .outerjoin(Instructor, Instructor.id == User.id)
+            .outerjoin(Student, Student.id == User.id)
+            .where(User.id == user_id)
+        ).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+
+        username, role, instructor_id, student_id = row
+        with self._lock:
+            self._entries[user_id] = (username, role, instructor_id, student_id, now + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return CachedUser(user_id, username, role, instructor_id, student_id)
+
+    def invalidate(self, *user_ids):
+        """Forget the given users so their next request reloads them."""
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Size and hit counters of this process."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+
+identity_cache = IdentityCache()
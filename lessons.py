@@ -0,0 +1,82 @@
+# lessons.py
+
+import hashlib
+
+import bleach
+import markdown
+
+from extensions import db
+from models import Lesson
+
+# Markdown extensions; nl2br keeps the line breaks of lessons written as plain text
+MARKDOWN_EXTENSIONS = ['extra', 'sane_lists', 'nl2br']
+
+# Markup allowed in rendered lessons; any other tag is stripped
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'dd', 'del', 'div', 'dl', 'dt', 'em',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 'span',
+    'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title'],
+    'abbr': ['title'],
+    'img': ['src', 'alt', 'title', 'width', 'height'],
+    'td': ['align'],
+    'th': ['align'],
+    '*': ['class', 'id'],
+}
+ALLOWED_PROTOCOLS = {'http', 'https', 'mailto'}
+
+
+def render_markdown(content):
+    """Render lesson Markdown to sanitized HTML."""
+    html = markdown.markdown(content or '', extensions=MARKDOWN_EXTENSIONS, output_format='html')
+    return bleach.clean(
+        html,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        protocols=ALLOWED_PROTOCOLS,
+        strip=True
+    )
+
+
+def lesson_hash(title, content):
+    """SHA-256 of everything the lesson page shows; used as the lesson's ETag."""
+    digest = hashlib.sha256()
+    digest.update((title or '').encode('utf-8'))
+    digest.update(b'\0')
+    digest.update((content or '').encode('utf-8'))
+    return digest.hexdigest()
+
+
+def compile_lesson(lesson, force=False):
+    """Store the rendered HTML and hash of a lesson; returns True if it had to be rendered.
+
+    Unchanged lessons are skipped unless ``force`` is set. The caller commits.
+    """
+    new_hash = lesson_hash(lesson.title, lesson.content)
+    if not force and lesson.content_html is not None and lesson.content_hash == new_hash:
+        return False
+    lesson.content_html = render_markdown(lesson.content)
+    lesson.content_hash = new_hash
+    return True
+
+
+def backfill_lessons(batch_size=200, force=False):
+    """Render every lesson missing its HTML (or all with ``force``), committing per batch; returns how many."""
+    query = db.select(Lesson).order_by(Lesson.id).limit(batch_size)
+    if not force:
+        query = query.where(Lesson.content_html.is_(None))
+
+    rendered = 0
+    last_id = 0
+    while True:
+        batch = db.session.execute(query.where(Lesson.id > last_id)).scalars().all()
+        if not batch:
+            break
+        for lesson in batch:
+            rendered += compile_lesson(lesson, force=force)
+        last_id = batch[-1].id
+        db.session.commit()
+        db.session.expunge_all()  # Keep memory flat on large tables
+    return rendered
@@ -0,0 +1,311 @@
+# metrics.py
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from flask import Response, abort, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from extensions import db, fragment_cache
+from identity import identity_cache
+
+# Upper bounds in seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    'tusome_http_requests_total': ('counter', 'Requests handled, by endpoint, method and status code.'),
+    'tusome_http_request_duration_seconds': ('histogram', 'Request latency by endpoint.'),
+    'tusome_http_requests_in_flight': ('gauge', 'Requests being handled, by endpoint.'),
+    'tusome_db_queries_total': ('counter', 'SQL statements executed, by endpoint.'),
+    'tusome_db_seconds_total': ('counter', 'Time spent executing SQL statements, by endpoint.'),
+    'tusome_cache_hits_total': ('counter', 'Cache lookups answered from the cache.'),
+    'tusome_cache_misses_total': ('counter', 'Cache lookups that had to compute the value.'),
+}
+
+
+class _Shard:
+    """Counters updated by one thread only, so recording takes no lock."""
+
+    __slots__ = ('counters', 'histograms', 'in_flight')
+
+    def __init__(self):
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # endpoint -> [count per bucket..., sum]
+        self.in_flight = {}  # endpoint -> requests
+
+    def merge(self, other):
+        """Add the counts of another shard to this one."""
+        for key, value in other.counters.copy().items():
+            _add(self.counters, key, value)
+        for endpoint, buckets in other.histograms.copy().items():
+            merged = self.histograms.setdefault(endpoint, [0] * len(buckets))
+            for index, value in enumerate(list(buckets)):
+                merged[index] += value
+        for endpoint, value in other.in_flight.copy().items():
+            _add(self.in_flight, endpoint, value)
+
+
+class _ShardOwner:
+    """Kept in the thread-local storage of a thread with a shard; freed, and the shard retired, when the thread ends."""
+
+    __slots__ = ('__weakref__',)
+
+
+def _add(target, key, value):
+    target[key] = target.get(key, 0) + value
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Metrics:
+    """Request counts, latency histograms, in-flight requests, DB time and cache counters,
+    served on /metrics in the Prometheus text format.
+
+    Each thread records into its own shard; when the thread ends, its shard is
+    folded into the totals of finished threads, so thread-per-request servers
+    do not pile up shards. With METRICS_DIR set, each worker
+    process writes its totals to <METRICS_DIR>/<pid>.json at most every
+    METRICS_FLUSH_INTERVAL seconds, and a scrape adds up the files of all
+    workers. Counters of exited workers are kept; their in-flight gauges are not.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.flush_interval = 1.0
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()  # Totals of the threads that have ended
+        self._shards_lock = threading.RLock()  # Reentrant, in case a shard is retired by a thread holding it
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+        self._base = None  # Totals of an exited worker that had our pid
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        if not self.enabled:
+            return
+        self.directory = app.config.get('METRICS_DIR')
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 1.0)
+        if self.directory:
+            atexit.register(self.flush)
+
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    # Recording
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            self._local.owner = owner = _ShardOwner()
+            weakref.finalize(owner, self._retire, shard).atexit = False
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _retire(self, shard):
+        with self._shards_lock:
+            self._retired.merge(shard)
+            self._shards.remove(shard)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'metrics_started' in g:
+            g.metrics_db_queries += 1
+            g.metrics_db_seconds += time.perf_counter() - context._metrics_started
+
+    def _start_request(self):
+        if request.endpoint == 'metrics':
+            return
+        endpoint = request.endpoint or 'unmatched'
+        _add(self._shard().in_flight, endpoint, 1)
+        g.metrics_endpoint = endpoint
+        g.metrics_db_queries = 0
+        g.metrics_db_seconds = 0.0
+        g.metrics_started = time.perf_counter()
+
+    def _record_status(self, response):
+        g.metrics_status = response.status_code
+        return response
+
+    def _finish_request(self, exc):
+        if 'metrics_started' not in g:
+            return
+        elapsed = time.perf_counter() - g.metrics_started
+        endpoint = g.metrics_endpoint
+        shard = self._shard()
+        shard.in_flight[endpoint] -= 1
+
+        status = g.get('metrics_status', 500)
+        _add(shard.counters, ('tusome_http_requests_total', (('endpoint', endpoint), ('method', request.method), ('status', str(status)))), 1)
+        if g.metrics_db_queries:
+            _add(shard.counters, ('tusome_db_queries_total', (('endpoint', endpoint),)), g.metrics_db_queries)
+            _add(shard.counters, ('tusome_db_seconds_total', (('endpoint', endpoint),)), g.metrics_db_seconds)
+
+        histogram = shard.histograms.get(endpoint)
+        if histogram is None:
+            histogram = shard.histograms[endpoint] = [0] * (len(LATENCY_BUCKETS) + 2)
+        histogram[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        histogram[-1] += elapsed
+
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush(block=False)
+
+    # Collection
+
+    def snapshot(self):
+        """Totals of this process, including those of an exited worker that had its pid."""
+        totals = _Shard()
+        # Held throughout, so a shard being retired is counted either live or retired, not both
+        with self._shards_lock:
+            totals.merge(self._retired)
+            for shard in list(self._shards):
+                totals.merge(shard)
+        counters, histograms, in_flight = totals.counters, totals.histograms, totals.in_flight
+
+        for cache, stats in (('fragments', fragment_cache.stats()), ('users', identity_cache.stats())):
+            counters[('tusome_cache_hits_total', (('cache', cache),))] = stats['hits']
+            counters[('tusome_cache_misses_total', (('cache', cache),))] = stats['misses']
+
+        if self._base:
+            for key, value in self._base['counters'].items():
+                _add(counters, key, value)
+            for endpoint, buckets in self._base['histograms'].items():
+                merged = histograms.setdefault(endpoint, [0] * len(buckets))
+                for index, value in enumerate(buckets):
+                    merged[index] += value
+        return {'counters': counters, 'histograms': histograms, 'in_flight': in_flight}
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'{pid}.json')
+
+    def flush(self, block=True):
+        """Write this process's totals to its file in METRICS_DIR."""
+        if not self.directory or not self._flush_lock.acquire(blocking=block):
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(os.getpid())
+            if self._base is None:
+                # A file with our pid belongs to an exited worker; carry its counters on
+                try:
+                    self._base = _load(path)
+                except (OSError, ValueError):
+                    self._base = {'counters': {}, 'histograms': {}}
+            data = self.snapshot()
+            temporary = f'{path}.{threading.get_ident()}.tmp'
+            with open(temporary, 'w') as out:
+                json.dump({
+                    'buckets': LATENCY_BUCKETS,
+                    'counters': [[name, labels, value] for (name, labels), value in data['counters'].items()],
+                    'histograms': data['histograms'],
+                    'in_flight': data['in_flight'],
+                }, out)
+            os.replace(temporary, path)
+            self._last_flush = time.monotonic()
+        finally:
+            self._flush_lock.release()
+
+    def collect(self):
+        """Totals of every worker: this process's live counters plus the files of the others."""
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        counters, histograms, in_flight = {}, {}, {}
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            pid = int(os.path.basename(path).split('.')[0])
+            try:
+                data = _load(path)
+            except (OSError, ValueError):
+                continue  # Replaced or half-written; the next scrape reads it
+            for key, value in data['counters'].items():
+                _add(counters, key, value)
+            for endpoint, buckets in data['histograms'].items():
+                if len(buckets) != len(LATENCY_BUCKETS) + 2:
+                    continue  # Written with other bucket bounds
+                merged = histograms.setdefault(endpoint, [0] * len(buckets))
+                for index, value in enumerate(buckets):
+                    merged[index] += value
+            if _pid_alive(pid):
+                for endpoint, value in data['in_flight'].items():
+                    _add(in_flight, endpoint, value)
+        return {'counters': counters, 'histograms': histograms, 'in_flight': in_flight}
+
+    def render(self):
+        """The collected metrics in the Prometheus text exposition format."""
+        data = self.collect()
+        by_name = {}
+        for (name, labels), value in data['counters'].items():
+            by_name.setdefault(name, []).append(f'{name}{_labels(labels)} {value}')
+
+        histogram = []
+        for endpoint, buckets in sorted(data['histograms'].items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), buckets):
+                cumulative += count
+                histogram.append(f'tusome_http_request_duration_seconds_bucket{_labels([("endpoint", endpoint), ("le", bound)])} {cumulative}')
+            histogram.append(f'tusome_http_request_duration_seconds_sum{_labels([("endpoint", endpoint)])} {buckets[-1]}')
+            histogram.append(f'tusome_http_request_duration_seconds_count{_labels([("endpoint", endpoint)])} {cumulative}')
+        by_name['tusome_http_request_duration_seconds'] = histogram
+        by_name['tusome_http_requests_in_flight'] = [
+            f'tusome_http_requests_in_flight{_labels([("endpoint", endpoint)])} {value}'
+            for endpoint, value in sorted(data['in_flight'].items())
+        ]
+
+        lines = []
+        for name, (kind, description) in HELP.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(sorted(by_name.get(name, [])) if kind != 'histogram' else by_name.get(name, []))
+        return '\n'.join(lines) + '\n'
+
+    def view(self):
+        token = current_app.config.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(401)
+        return Response(self.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _load(path):
+    with open(path) as source:
+        data = json.load(source)
+    return {
+        'counters': {(name, tuple(tuple(pair) for pair in labels)): value for name, labels, value in data['counters']},
+        'histograms': data['histograms'],
+        'in_flight': data.get('in_flight', {}),
+    }
+
+
+metrics = Metrics()
@@ -0,0 +1,90 @@
+# migrate.py
+
+import importlib
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from extensions import db
+
+# Migration scripts live in migrations/ and are named NNNN_description.py
+MIGRATIONS_PACKAGE = 'migrations'
+MIGRATIONS_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), MIGRATIONS_PACKAGE)
+_SCRIPT_NAME = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+Migration = namedtuple('Migration', ['version', 'name', 'module'])
+
+
+def discover_migrations():
+    """Return every migration script, ordered by version."""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_FOLDER)):
+        match = _SCRIPT_NAME.match(filename)
+        if match:
+            module = importlib.import_module(f'{MIGRATIONS_PACKAGE}.{filename[:-3]}')
+            migrations.append(Migration(match.group(1), match.group(2), module))
+    return migrations
+
+
+def _ensure_version_table(connection):
+    connection.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_version (version VARCHAR(4) PRIMARY KEY, name VARCHAR(200), applied_at DATETIME)'
+    ))
+
+
+def applied_versions(connection):
+    """Versions already recorded in the schema_version table."""
+    _ensure_version_table(connection)
+    return set(connection.execute(text('SELECT version FROM schema_version')).scalars())
+
+
+def pending_migrations():
+    """Migrations not yet applied to the database, in order."""
+    with db.engine.begin() as connection:
+        applied = applied_versions(connection)
+    return [migration for migration in discover_migrations() if migration.version not in applied]
+
+
+def upgrade(target=None):
+    """Apply the pending migrations up to ``target`` (all by default), each in its own transaction.
+
+    Scripts are written to be idempotent, so a migration that was interrupted,
+    or whose changes create_all() already made on a new database, can simply
+    run again. Returns the migrations applied.
+    """
+    applied = []
+    for migration in pending_migrations():
+        if target is not None and migration.version > target:
+            break
+        with db.engine.begin() as connection:
+            if migration.version in applied_versions(connection):
+                continue  # Applied by another process meanwhile
+            migration.module.upgrade(connection)
+            connection.execute(
+                text('INSERT INTO schema_version (version, name, applied_at) VALUES (:version, :name, :applied_at)'),
+                {'version': migration.version, 'name': migration.name, 'applied_at': datetime.utcnow()}
+            )
+        applied.append(migration)
+    return applied
+
+
+# Helpers for migration scripts
+
+def has_column(connection, table, column):
+    return column in {info['name'] for info in inspect(connection).get_columns(table)}
+
+
+def add_column(connection, table, column, ddl):
+    """ALTER TABLE ... ADD COLUMN unless the column exists; ``ddl`` is its type and constraints."""
+    if not has_column(connection, table, column):
+        connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+
+def create_index(connection, name, table, columns, unique=False):
+    """CREATE INDEX IF NOT EXISTS on the given columns."""
+    connection.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    ))
@@ -0,0 +1,23 @@
+# migrations/0001_hot_query_indexes.py
+"""Indexes for the lookups and keyset listings on the busiest routes."""
+
+from migrate import create_index
+
+INDEXES = [
+    ('ix_enrollment_course_id', 'enrollment', ['course_id']),
+    ('ix_quiz_submission_student_quiz_question', 'quiz_submission', ['student_id', 'quiz_id', 'question_id']),
+    ('ix_quiz_submission_quiz_student', 'quiz_submission', ['quiz_id', 'student_id']),
+    ('ix_course_instructor_id', 'course', ['instructor_id']),
+    ('ix_course_title', 'course', ['title', 'id']),
+    ('ix_course_featured_title', 'course', ['is_featured', 'title', 'id']),
+    ('ix_notice_date_posted', 'notice', ['date_posted', 'id']),
+    ('ix_lesson_course_id', 'lesson', ['course_id']),
+    ('ix_quiz_course_id', 'quiz', ['course_id']),
+    ('ix_question_quiz_id', 'question', ['quiz_id']),
+    ('ix_course_material_course_id', 'course_material', ['course_id']),
+]
+
+
+def upgrade(connection):
+    for name, table, columns in INDEXES:
+        create_index(connection, name, table, columns)
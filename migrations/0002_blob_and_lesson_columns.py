@@ -0,0 +1,11 @@
+# migrations/0002_blob_and_lesson_columns.py
+"""Columns added before migrations existed: blob references and precompiled lesson HTML."""
+
+from migrate import add_column
+
+
+def upgrade(connection):
+    add_column(connection, 'course_material', 'blob_sha256', 'VARCHAR(64) REFERENCES blob (sha256)')
+    add_column(connection, 'submission', 'blob_sha256', 'VARCHAR(64) REFERENCES blob (sha256)')
+    add_column(connection, 'lesson', 'content_html', 'TEXT')
+    add_column(connection, 'lesson', 'content_hash', 'VARCHAR(64)')
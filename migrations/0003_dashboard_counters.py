@@ -0,0 +1,11 @@
+# migrations/0003_dashboard_counters.py
+"""Dashboard counter tables, filled in from the existing courses, enrollments, quizzes and submissions."""
+
+from counters import reconcile_counters
+from models import CourseStats, InstructorStats
+
+
+def upgrade(connection):
+    CourseStats.__table__.create(connection, checkfirst=True)
+    InstructorStats.__table__.create(connection, checkfirst=True)
+    reconcile_counters(connection)
@@ -0,0 +1,15 @@
+# migrations/0004_lesson_completion.py
+"""Lesson completions, the per-enrollment completed lesson count and the cached lesson count per course."""
+
+from counters import reconcile_counters
+from migrate import add_column
+from models import LessonCompletion
+from progress import reconcile_progress
+
+
+def upgrade(connection):
+    LessonCompletion.__table__.create(connection, checkfirst=True)
+    add_column(connection, 'enrollment', 'completed_lessons', 'INTEGER NOT NULL DEFAULT 0')
+    add_column(connection, 'course_stats', 'lessons', 'INTEGER NOT NULL DEFAULT 0')
+    reconcile_counters(connection)
+    reconcile_progress(connection)
@@ -0,0 +1,13 @@
+# migrations/0005_course_notices.py
+"""Notices belong to a course; enrollments keep a read marker and an unread notice count."""
+
+from migrate import add_column, create_index
+from notices import reconcile_unread
+
+
+def upgrade(connection):
+    add_column(connection, 'notice', 'course_id', 'INTEGER REFERENCES course (id)')
+    add_column(connection, 'enrollment', 'last_read_notice_id', 'INTEGER')
+    add_column(connection, 'enrollment', 'unread_notices', 'INTEGER NOT NULL DEFAULT 0')
+    create_index(connection, 'ix_notice_course', 'notice', ['course_id', 'id'])
+    reconcile_unread(connection)
@@ -0,0 +1,21 @@
+# migrations/0006_catalog_versions.py
+"""Version numbers and modification times of courses, lessons, quizzes and materials, for the catalog API."""
+
+from datetime import datetime
+
+from sqlalchemy import text
+
+from migrate import add_column
+
+VERSIONED_TABLES = ('course', 'lesson', 'quiz', 'course_material')
+
+
+def upgrade(connection):
+    now = datetime.utcnow()
+    for table in VERSIONED_TABLES:
+        add_column(connection, table, 'version', 'INTEGER NOT NULL DEFAULT 1')
+        add_column(connection, table, 'updated_at', 'DATETIME')
+    # Existing rows were last changed at some unknown time; materials at the latest when they were uploaded
+    connection.execute(text('UPDATE course_material SET updated_at = upload_date WHERE updated_at IS NULL'))
+    for table in VERSIONED_TABLES:
+        connection.execute(text(f'UPDATE {table} SET updated_at = :now WHERE updated_at IS NULL'), {'now': now})
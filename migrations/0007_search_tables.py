@@ -0,0 +1,9 @@
+# migrations/0007_search_tables.py
+"""Full-text search tables, created and filled for databases set up before migrations existed."""
+
+from search import rebuild_search_index
+
+
+def upgrade(connection):
+    # Creates the FTS5 tables if missing and reindexes every course, lesson and notice; nothing on other databases
+    rebuild_search_index(connection)
@@ -0,0 +1,10 @@
+# migrations/0008_quiz_results.py
+"""Materialized quiz totals, computed from the quiz answers given before the QuizResult table existed."""
+
+from grading import rebuild_quiz_results
+from models import QuizResult
+
+
+def upgrade(connection):
+    QuizResult.__table__.create(connection, checkfirst=True)
+    rebuild_quiz_results(executor=connection)
@@ -52,13 +52,26 @@ class Student(db.Model):
 
     quiz_submissions = db.relationship('QuizSubmission', back_populates='student', lazy=True)
 
-class Course(db.Model):
+    quiz_results = db.relationship('QuizResult', back_populates='student', lazy=True)
+
+class Versioned:
+    """A version number and modification time, changed by every UPDATE of the row; the API's ETag and Last-Modified."""
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1', onupdate=db.literal_column('version') + 1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Course(Versioned, db.Model):
     """Model for Course."""
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
     is_featured = db.Column(db.Boolean, default=False)
-    instructor_id = db.Column(db.Integer, db.ForeignKey('instructor.id'), nullable=False)
+    instructor_id = db.Column(db.Integer, db.ForeignKey('instructor.id'), nullable=False, index=True)
+
+    # Keyset-paginated listings, all courses and the featured ones, sort by (title, id)
+    __table_args__ = (
+        db.Index('ix_course_title', 'title', 'id'),
+        db.Index('ix_course_featured_title', 'is_featured', 'title', 'id'),
+    )
 
     # Define relationship with Instructor
     instructor = db.relationship('Instructor', back_populates='courses')
@@ -70,13 +83,15 @@ class Course(db.Model):
     enrollments = db.relationship('Enrollment', back_populates='course', lazy=True)
     submissions = db.relationship('Submission', back_populates='course', lazy=True)
 
-class Lesson(db.Model):
+class Lesson(Versioned, db.Model):
     """Model for Lesson."""
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
     slug = db.Column(db.String(100), unique=True, nullable=False)  # Use this for the URL
-    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+    content_html = db.Column(db.Text, nullable=True)  # Sanitized HTML rendered from content on save
+    content_hash = db.Column(db.String(64), nullable=True)  # SHA-256 of title and content; the page ETag
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False, index=True)
 
     # Define relationship with Course
     course = db.relationship('Course', back_populates='lessons')
@@ -85,8 +100,11 @@ class Enrollment(db.Model):
     """Model for Enrollment of Students in Courses."""
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
-    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
-    progress = db.Column(db.Float, default=0.0)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False, index=True)
+    progress = db.Column(db.Float, default=0.0)  # Share of the course's lessons completed, 0.0 to 1.0
+    completed_lessons = db.Column(db.Integer, nullable=False, default=0)  # Maintained by progress.py
+    last_read_notice_id = db.Column(db.Integer)  # Newest notice of the course the student has read
+    unread_notices = db.Column(db.Integer, nullable=False, default=0)  # Notices posted since; maintained by notices.py
 
     __table_args__ = (db.UniqueConstraint('student_id', 'course_id', name='unique_enrollment'),)
 
@@ -94,10 +112,20 @@ class Enrollment(db.Model):
     student = db.relationship('Student', back_populates='enrollments')
     course = db.relationship('Course', back_populates='enrollments')
 
-class Quiz(db.Model):
-    """Model for Quiz associated with a Course."""
+class LessonCompletion(db.Model):
+    """A lesson a student has marked as done; counted in the student's Enrollment.completed_lessons."""
     id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lesson.id'), nullable=False, index=True)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+    completed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('student_id', 'lesson_id', name='unique_lesson_completion'),)
+
+class Quiz(Versioned, db.Model):
+    """Model for Quiz associated with a Course."""
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False, index=True)
     title = db.Column(db.String(200), nullable=False)
     status = db.Column(db.String(20), nullable=False)
 
@@ -109,34 +137,59 @@ class Quiz(db.Model):
 
     quiz_submissions = db.relationship('QuizSubmission', back_populates='quiz', lazy=True)
 
+    quiz_results = db.relationship('QuizResult', back_populates='quiz', lazy=True)
+
 class Question(db.Model):
     """Model for Questions in a Quiz."""
     id = db.Column(db.Integer, primary_key=True)
     question_text = db.Column(db.Text, nullable=False)
     correct_answer = db.Column(db.String(200), nullable=False)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
 
     # Define relationship with Quiz
     quiz = db.relationship('Quiz', back_populates='questions')
 
     quiz_submissions = db.relationship('QuizSubmission', back_populates='question', lazy=True)
 
-class CourseMaterial(db.Model):
+class Blob(db.Model):
+    """Model for a stored file, addressed by the SHA-256 of its content and shared by every row that references it."""
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CourseMaterial(Versioned, db.Model):
     """Model for Course Materials uploaded by Instructors."""
     id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(100), nullable=False)
-    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+    filename = db.Column(db.String(100), nullable=False)  # Original name, used as the download name
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('blob.sha256'), nullable=True)  # None for files saved before the blob store
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False, index=True)
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Define relationship with Course
     course = db.relationship('Course', back_populates='materials')
 
+class UploadSession(db.Model):
+    """Model for a chunked, resumable upload that has not been committed yet."""
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, also names the partial file
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    purpose = db.Column(db.String(20), nullable=False)  # 'material' or 'assignment'
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+    filename = db.Column(db.String(100), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    received_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    next_chunk = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
 class Submission(db.Model):
     """Model for Student Submissions."""
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
     submission_file = db.Column(db.String(100), nullable=False)
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('blob.sha256'), nullable=True)
     submission_date = db.Column(db.DateTime, default=datetime.utcnow)
     grade = db.Column(db.Float, nullable=True)  # Changed to Float for possible decimal grades
 
@@ -154,6 +207,12 @@ class QuizSubmission(db.Model):
     submission_date = db.Column(db.DateTime, default=datetime.utcnow)
     grade = db.Column(db.String(10))
 
+    # Per-student answer lookups, and a quiz's answers grouped by student
+    __table_args__ = (
+        db.Index('ix_quiz_submission_student_quiz_question', 'student_id', 'quiz_id', 'question_id'),
+        db.Index('ix_quiz_submission_quiz_student', 'quiz_id', 'student_id'),
+    )
+
     # Relationships
     student = db.relationship('Student', back_populates='quiz_submissions')
     quiz = db.relationship('Quiz', back_populates='quiz_submissions')
@@ -166,12 +225,54 @@ class QuizSubmission(db.Model):
         else:
             return 0  # 0 points for incorrect answer
 
+class QuizResult(db.Model):
+    """Materialized total score of a student's quiz attempt, kept in sync with QuizSubmission grades."""
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False, default=0.0)
+    max_score = db.Column(db.Integer, nullable=False, default=0)
+    submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('student_id', 'quiz_id', name='unique_quiz_result'),)
+
+    # Relationships
+    student = db.relationship('Student', back_populates='quiz_results')
+    quiz = db.relationship('Quiz', back_populates='quiz_results')
+
+class CourseStats(db.Model):
+    """Denormalized counters of a course for the dashboards, maintained by counters.py."""
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), primary_key=True)
+    enrolled_students = db.Column(db.Integer, nullable=False, default=0)
+    lessons = db.Column(db.Integer, nullable=False, default=0)
+    active_quizzes = db.Column(db.Integer, nullable=False, default=0)
+    inactive_quizzes = db.Column(db.Integer, nullable=False, default=0)
+    ungraded_submissions = db.Column(db.Integer, nullable=False, default=0)
+
+class InstructorStats(db.Model):
+    """Denormalized counters over all courses of an instructor, maintained by counters.py."""
+    instructor_id = db.Column(db.Integer, db.ForeignKey('instructor.id'), primary_key=True)
+    courses = db.Column(db.Integer, nullable=False, default=0)
+    enrolled_students = db.Column(db.Integer, nullable=False, default=0)  # Distinct students across the courses
+    active_quizzes = db.Column(db.Integer, nullable=False, default=0)
+    inactive_quizzes = db.Column(db.Integer, nullable=False, default=0)
+    ungraded_submissions = db.Column(db.Integer, nullable=False, default=0)
+
 class Notice(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=False)
     date_posted = db.Column(db.DateTime, default=datetime.utcnow)
     instructor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # Assuming instructors are in the User model
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'))  # None for notices posted before notices belonged to a course
+
+    course = db.relationship('Course')
+
+    # Newest-first keyset pagination sorts by (date_posted, id); the unread counts and the stream look up by (course_id, id)
+    __table_args__ = (
+        db.Index('ix_notice_date_posted', 'date_posted', 'id'),
+        db.Index('ix_notice_course', 'course_id', 'id'),
+    )
 
     def __repr__(self):
         return f"<Notice {self.title}>"
\ No newline at end of file
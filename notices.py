@@ -0,0 +1,254 @@
+# notices.py
+"""Course notices: unread counts per enrollment and the Server-Sent Events stream of new notices.
+
+Each enrollment keeps the id of the newest notice its student has read in that
+course and the number posted since, so the unread badge is one indexed SUM.
+The functions changing them run in the caller's transaction; the caller commits.
+"""
+
+import json
+import queue
+import threading
+import time
+
+from sqlalchemy import func, tuple_
+
+from extensions import db
+from models import Course, Enrollment, Notice
+
+POLL_BATCH = 500  # Notices published per poll; the poller loops at once while there are more
+
+
+# Unread counts
+
+def notice_posted(notice):
+    """Count a new notice as unread for every student of its course."""
+    db.session.execute(
+        db.update(Enrollment)
+        .where(Enrollment.course_id == notice.course_id)
+        .values(unread_notices=Enrollment.unread_notices + 1)
+    )
+
+
+def enrollments_added(pairs):
+    """Count the notices already posted in a course as unread for new (student_id, course_id) enrollments."""
+    pairs = list(pairs)
+    courses = {course_id for _, course_id in pairs}
+    if not courses or not db.session.execute(db.select(Notice.id).where(Notice.course_id.in_(courses)).limit(1)).first():
+        return
+    posted = db.select(func.count(Notice.id)).where(Notice.course_id == Enrollment.course_id).scalar_subquery()
+    db.session.execute(
+        db.update(Enrollment)
+        .where(tuple_(Enrollment.student_id, Enrollment.course_id).in_(pairs))
+        .values(unread_notices=posted)
+    )
+
+
+def unread_count(student_id):
+    """Unread notices of a student across their courses."""
+    return db.session.execute(
+        db.select(func.coalesce(func.sum(Enrollment.unread_notices), 0)).where(Enrollment.student_id == student_id)
+    ).scalar()
+
+
+def unread_state(student_id):
+    """(unread notices, id of the newest notice) of a student's courses, read in one statement so they agree."""
+    courses = db.select(Enrollment.course_id).where(Enrollment.student_id == student_id)
+    newest = db.select(func.max(Notice.id)).where(Notice.course_id.in_(courses)).scalar_subquery()
+    unread, newest_id = db.session.execute(
+        db.select(func.coalesce(func.sum(Enrollment.unread_notices), 0), newest).where(Enrollment.student_id == student_id)
+    ).one()
+    return unread, newest_id or 0
+
+
+def read_markers(student_id):
+    """{course id: id of the newest notice read} for the courses where a student has unread notices."""
+    return dict(db.session.execute(
+        db.select(Enrollment.course_id, func.coalesce(Enrollment.last_read_notice_id, 0))
+        .where(Enrollment.student_id == student_id, Enrollment.unread_notices > 0)
+    ).all())
+
+
+def mark_read(student_id):
+    """Mark every notice of a student's courses as read."""
+    newest = db.select(func.max(Notice.id)).where(Notice.course_id == Enrollment.course_id).scalar_subquery()
+    db.session.execute(
+        db.update(Enrollment)
+        .where(Enrollment.student_id == student_id, Enrollment.unread_notices > 0)
+        .values(unread_notices=0, last_read_notice_id=newest)
+    )
+
+
+def reconcile_unread(executor=None):
+    """Recount the unread notices of every enrollment from its read marker; returns the enrollments fixed.
+
+    ``executor`` is the session (default) or a connection, e.g. in a migration.
+    """
+    executor = executor or db.session
+    enrollment = Enrollment.__table__
+    unread = (
+        db.select(func.count(Notice.id))
+        .where(Notice.course_id == enrollment.c.course_id, Notice.id > func.coalesce(enrollment.c.last_read_notice_id, 0))
+        .scalar_subquery()
+    )
+    return executor.execute(
+        enrollment.update().where(enrollment.c.unread_notices != unread).values(unread_notices=unread)
+    ).rowcount
+
+
+def notices_since(course_ids, after_id, up_to_id, limit):
+    """The last ``limit`` notices of the given courses with after_id < id <= up_to_id, oldest first, as stream events."""
+    rows = db.session.execute(
+        db.select(Notice.id, Notice.course_id, Course.title, Notice.title, Notice.date_posted)
+        .join(Course, Course.id == Notice.course_id)
+        .where(Notice.course_id.in_(course_ids), Notice.id > after_id, Notice.id <= up_to_id)
+        .order_by(Notice.id.desc())
+        .limit(limit)
+    )
+    return [_event(*row) for row in reversed(rows.all())]
+
+
+def _event(notice_id, course_id, course_title, title, date_posted):
+    return {'id': notice_id, 'course_id': course_id, 'course': course_title, 'title': title,
+            'date_posted': date_posted.isoformat() if date_posted else None}
+
+
+# Push
+
+class Subscription:
+    """The queue of one open stream and the courses it listens to."""
+
+    __slots__ = ('course_ids', 'queue', 'overflowed')
+
+    def __init__(self, course_ids, size):
+        self.course_ids = frozenset(course_ids)
+        self.queue = queue.Queue(maxsize=size)
+        self.overflowed = False
+
+
+class NoticeBroker:
+    """Fans new notices out to the open streams of the students of their course.
+
+    One poller thread per process looks for notices newer than the last one it
+    saw, so the database load does not grow with the number of streams, and
+    notices posted by other worker processes arrive within NOTICE_POLL_INTERVAL.
+    Each subscriber gives the newest notice it already has, and the poller reads
+    on from the oldest of those, so a notice posted while a stream starts is
+    not skipped; streams drop notices they have already sent.
+    notify() wakes the poller at once after a notice is posted in this process.
+    A stream only waits on its own queue; run the app under an async worker
+    (e.g. gunicorn -k gevent) so thousands of idle streams do not each hold an
+    OS thread. A stream whose queue fills up is ended, and the browser reconnects
+    and catches up from Last-Event-ID.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._by_course = {}  # course id -> set of subscriptions
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._last_id = None  # Newest notice published; None until the poller starts
+
+    def init_app(self, app):
+        self.app = app
+
+    def subscribe(self, course_ids, after_id):
+        """Queue the notices of the given courses newer than ``after_id`` for a new stream."""
+        subscription = Subscription(course_ids, self.app.config['NOTICE_QUEUE_SIZE'])
+        with self._lock:
+            for course_id in subscription.course_ids:
+                self._by_course.setdefault(course_id, set()).add(subscription)
+            if self._last_id is None or after_id < self._last_id:
+                self._last_id = after_id  # Anything newer may have been published before this stream subscribed
+                self._wakeup.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._poll, name='notice-broker', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for course_id in subscription.course_ids:
+                subscribers = self._by_course.get(course_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_course[course_id]
+
+    def notify(self):
+        """Wake the poller; call after committing a new notice."""
+        self._wakeup.set()
+
+    def publish(self, event):
+        """Queue an event for the streams of its course."""
+        with self._lock:
+            subscribers = list(self._by_course.get(event['course_id'], ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                subscription.overflowed = True
+
+    def _poll(self):
+        interval = self.app.config['NOTICE_POLL_INTERVAL']
+        while True:
+            with self._lock:
+                if not self._by_course:
+                    self._thread = None  # The next subscriber starts a new poller
+                    self._last_id = None
+                    return
+                last_id = self._last_id
+            rows = []
+            try:
+                with self.app.app_context():
+                    rows = db.session.execute(
+                        db.select(Notice.id, Notice.course_id, Course.title, Notice.title, Notice.date_posted)
+                        .join(Course, Course.id == Notice.course_id)
+                        .where(Notice.id > last_id)
+                        .order_by(Notice.id)
+                        .limit(POLL_BATCH)
+                    ).all()
+            except Exception:
+                self.app.logger.exception('Polling for new notices failed')
+            for row in rows:
+                self.publish(_event(*row))
+            if rows:
+                with self._lock:
+                    if self._last_id == last_id:  # Unless a new subscriber moved it back meanwhile
+                        self._last_id = rows[-1][0]
+            if len(rows) < POLL_BATCH:
+                self._wakeup.wait(interval)
+                self._wakeup.clear()
+
+    def stream(self, subscription, unread, newest_id, backlog):
+        """The text/event-stream body of a subscription: the unread count, missed notices, then new ones.
+
+        ``unread`` counts every notice up to ``newest_id``, so the missed ones in
+        ``backlog`` are sent as already counted and later ones only from the queue.
+        """
+        config = self.app.config
+        heartbeat, deadline = config['NOTICE_HEARTBEAT'], time.monotonic() + config['NOTICE_STREAM_TIMEOUT']
+        sent_id = newest_id  # Older notices are in the unread count already, newer ones are sent once
+        try:
+            yield f"retry: {int(config['NOTICE_RETRY_MS'])}\nevent: unread\ndata: {json.dumps({'unread': unread})}\n\n"
+            for event in backlog:
+                yield _format(dict(event, counted=True))
+            while not subscription.overflowed and time.monotonic() < deadline:
+                try:
+                    event = subscription.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if event['id'] > sent_id:
+                    sent_id = event['id']
+                    yield _format(event)
+        finally:
+            self.unsubscribe(subscription)
+
+
+def _format(event):
+    return f"id: {event['id']}\nevent: notice\ndata: {json.dumps(event)}\n\n"
+
+
+notice_broker = NoticeBroker()
@@ -0,0 +1,125 @@
+# pagination.py
+
+import base64
+import json
+from datetime import datetime
+
+from flask import abort, current_app, request
+from sqlalchemy import and_, or_
+
+from extensions import db
+
+
+class KeysetPage:
+    """One page of a keyset (seek) paginated query."""
+
+    def __init__(self, items, next_cursor, prev_cursor, per_page):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.per_page = per_page
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(values, direction):
+    """Encode the sort key of a boundary row into an opaque URL-safe token."""
+    payload = json.dumps({'k': [_encode_value(value) for value in values], 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token into (values, direction); raises ValueError if it is malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [_decode_value(value) for value in payload['k']]
+        direction = payload['d']
+    except (ValueError, TypeError, KeyError):
+        raise ValueError('Invalid cursor')
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values, direction
+
+
+def _seek_condition(order_by, values):
+    """Build the WHERE clause selecting rows strictly after the given sort key.
+
+    Expanded as (a > x) OR (a = x AND b > y) ... so columns may mix directions.
+    """
+    clauses = []
+    for index, (column, descending) in enumerate(order_by):
+        equal_prefix = [order_by[i][0] == values[i] for i in range(index)]
+        step = column < values[index] if descending else column > values[index]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def keyset_paginate(select, order_by, cursor=None, per_page=None, rows=False):
+    """Run a select one page at a time, seeking from a cursor instead of using OFFSET.
+
+    ``order_by`` is a list of (column, descending) pairs that must end with a
+    unique column (usually the primary key) so the ordering is stable. The
+    select must return ORM entities that expose those columns as attributes,
+    or with ``rows`` result rows that include them under their own names.
+    """
+    values, direction = decode_cursor(cursor) if cursor else (None, 'next')
+    if values is not None and len(values) != len(order_by):
+        raise ValueError('Invalid cursor')
+
+    # Walking backwards means flipping every column's direction, then the rows
+    backwards = direction == 'prev'
+    effective_order = [(column, descending != backwards) for column, descending in order_by]
+
+    if values is not None:
+        select = select.where(_seek_condition(effective_order, values))
+    select = select.order_by(*[column.desc() if descending else column.asc() for column, descending in effective_order])
+    result = db.session.execute(select.limit(per_page + 1))
+    items = list(result.all() if rows else result.unique().scalars())
+
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if backwards:
+        items.reverse()
+
+    def key_of(item):
+        return [getattr(item, column.key) for column, _ in order_by]
+
+    next_cursor = prev_cursor = None
+    if items:
+        if has_more or backwards:
+            next_cursor = encode_cursor(key_of(items[-1]), 'next')
+        if values is not None and (has_more or not backwards):
+            prev_cursor = encode_cursor(key_of(items[0]), 'prev')
+    return KeysetPage(items, next_cursor, prev_cursor, per_page)
+
+
+def paginate_request(select, order_by, rows=False):
+    """Keyset paginate a select using the ``cursor`` and ``per_page`` request arguments."""
+    per_page = request.args.get('per_page', current_app.config['PER_PAGE'], type=int)
+    per_page = max(1, min(per_page, current_app.config['MAX_PER_PAGE']))
+    try:
+        return keyset_paginate(select, order_by, cursor=request.args.get('cursor'), per_page=per_page, rows=rows)
+    except ValueError:
+        abort(400)
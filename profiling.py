@@ -0,0 +1,188 @@
+# profiling.py
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from extensions import db
+
+logger = logging.getLogger('tusome.sql')
+
+_IN_LIST = re.compile(r'\(\s*(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))*\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    """Normalize a SQL statement so executions that differ only in their values compare equal."""
+    statement = _LITERAL.sub('?', statement)
+    statement = _IN_LIST.sub('(?)', statement)  # Expanded IN lists of any length
+    return _SPACE.sub(' ', statement).strip()
+
+
+class RequestProfile:
+    """Queries issued while handling one request."""
+
+    __slots__ = ('count', 'seconds', 'fingerprints')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold):
+        """Fingerprints executed at least ``threshold`` times, most frequent first."""
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n >= threshold]
+
+    def header(self, threshold):
+        return f'queries={self.count}; time_ms={self.seconds * 1000:.2f}; repeated={len(self.repeated(threshold))}'
+
+
+class EndpointStats:
+    """Running totals of the requests to one endpoint."""
+
+    __slots__ = ('requests', 'queries', 'max_queries', 'seconds', 'max_seconds', 'n_plus_one', 'repeats')
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.n_plus_one = 0  # Requests in which some statement repeated SQL_REPEAT_THRESHOLD times
+        self.repeats = {}  # fingerprint -> [min, max] executions per request
+
+    def add(self, profile, threshold):
+        self.requests += 1
+        self.queries += profile.count
+        self.max_queries = max(self.max_queries, profile.count)
+        self.seconds += profile.seconds
+        self.max_seconds = max(self.max_seconds, profile.seconds)
+        repeated = profile.repeated(threshold)
+        self.n_plus_one += bool(repeated)
+        for sql, n in repeated:
+            bounds = self.repeats.setdefault(sql, [n, n])
+            bounds[0] = min(bounds[0], n)
+            bounds[1] = max(bounds[1], n)
+
+    def grows_with_results(self):
+        """Repeated statements whose count per request varied, i.e. one query per row of a result."""
+        return sorted(
+            ((sql, low, high) for sql, (low, high) in self.repeats.items() if high > low),
+            key=lambda item: item[2],
+            reverse=True
+        )
+
+    def to_dict(self, endpoint):
+        return {
+            'endpoint': endpoint,
+            'requests': self.requests,
+            'avg_queries': round(self.queries / self.requests, 1) if self.requests else 0,
+            'max_queries': self.max_queries,
+            'avg_ms': round(self.seconds * 1000 / self.requests, 2) if self.requests else 0,
+            'max_ms': round(self.max_seconds * 1000, 2),
+            'n_plus_one_requests': self.n_plus_one,
+            'repeated': [
+                {'sql': sql, 'min': low, 'max': high}
+                for sql, (low, high) in sorted(self.repeats.items(), key=lambda item: item[1][1], reverse=True)
+            ],
+            'grows_with_results': [sql for sql, _, _ in self.grows_with_results()],
+        }
+
+
+class SQLProfiler:
+    """Opt-in (SQL_PROFILING) query counting, timing and N+1 detection for each request.
+
+    Hooks the cursor events of every engine. Each response gets an X-DB-Profile
+    and a Server-Timing header; totals per endpoint and the slowest statements
+    are kept in memory for the admin report, so each worker has its own.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = None
+        self.repeat_threshold = 5
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._slow = deque(maxlen=100)
+        self._started = time.time()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SQL_PROFILING', False)
+        self.slow_ms = app.config.get('SQL_SLOW_QUERY_MS')
+        self.repeat_threshold = app.config.get('SQL_REPEAT_THRESHOLD', 5)
+        self._slow = deque(maxlen=app.config.get('SQL_SLOW_QUERY_LOG_SIZE', 100))
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._profile_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - context._profile_started
+        profile = g.get('sql_profile') if has_request_context() else None
+        if profile is not None:
+            profile.record(statement, seconds)
+        if self.slow_ms is not None and seconds * 1000 >= self.slow_ms:
+            endpoint = request.endpoint if has_request_context() else None
+            logger.warning('Slow query (%.1f ms) in %s: %s', seconds * 1000, endpoint or '-', statement)
+            with self._lock:
+                self._slow.append({
+                    'at': time.time(),
+                    'endpoint': endpoint,
+                    'ms': round(seconds * 1000, 2),
+                    'sql': _SPACE.sub(' ', statement).strip(),
+                })
+
+    def _start_request(self):
+        g.sql_profile = RequestProfile()
+
+    def _finish_request(self, response):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+        response.headers['X-DB-Profile'] = profile.header(self.repeat_threshold)
+        response.headers.add('Server-Timing', f'db;dur={profile.seconds * 1000:.2f};desc="{profile.count} queries"')
+        if request.endpoint and request.endpoint != 'static':
+            with self._lock:
+                self._endpoints.setdefault(request.endpoint, EndpointStats()).add(profile, self.repeat_threshold)
+        return response
+
+    def report(self):
+        """Endpoints by total DB time and the latest slow statements of this worker."""
+        with self._lock:
+            endpoints = sorted(self._endpoints.items(), key=lambda item: item[1].seconds, reverse=True)
+            return {
+                'enabled': self.enabled,
+                'since': self._started,
+                'slow_query_ms': self.slow_ms,
+                'repeat_threshold': self.repeat_threshold,
+                'endpoints': [stats.to_dict(endpoint) for endpoint, stats in endpoints],
+                'slow_queries': list(reversed(self._slow)),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._slow.clear()
+            self._started = time.time()
+
+
+sql_profiler = SQLProfiler()
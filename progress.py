@@ -0,0 +1,96 @@
+# progress.py
+"""Lesson completion and Enrollment.progress.
+
+An enrollment keeps the number of lessons its student completed and each course
+caches its lesson count in CourseStats.lessons. Marking a lesson done therefore
+updates a single enrollment row, and adding or deleting a lesson rescales every
+enrollment of the course with one UPDATE. The caller commits.
+"""
+
+from sqlalchemy import case, func
+
+from counters import lessons_changed
+from extensions import db, insert_ignore
+from models import CourseStats, Enrollment, Lesson, LessonCompletion
+
+
+def _progress(completed, lessons):
+    """SQL expression for the share of ``lessons`` done, given an expression for the lessons completed."""
+    return completed * 1.0 / lessons if lessons > 0 else 0.0
+
+
+def lesson_count(course_id):
+    """The cached number of lessons in a course."""
+    return db.session.execute(db.select(CourseStats.lessons).where(CourseStats.course_id == course_id)).scalar() or 0
+
+
+def is_completed(student_id, lesson_id):
+    return db.session.execute(
+        db.select(LessonCompletion.id).where(LessonCompletion.student_id == student_id, LessonCompletion.lesson_id == lesson_id)
+    ).first() is not None
+
+
+def complete_lesson(student_id, lesson):
+    """Record that a student finished a lesson; returns False if it was already recorded."""
+    if not insert_ignore(LessonCompletion, [{'student_id': student_id, 'lesson_id': lesson.id, 'course_id': lesson.course_id}]):
+        return False
+    # progress is assigned first so every database computes it from the old completed_lessons
+    db.session.execute(
+        db.update(Enrollment)
+        .where(Enrollment.student_id == student_id, Enrollment.course_id == lesson.course_id)
+        .ordered_values(
+            (Enrollment.progress, _progress(Enrollment.completed_lessons + 1, lesson_count(lesson.course_id))),
+            (Enrollment.completed_lessons, Enrollment.completed_lessons + 1)
+        )
+    )
+    return True
+
+
+def lesson_added(lesson):
+    """Count a new lesson and rescale the progress of everyone enrolled in its course."""
+    lessons = lessons_changed(lesson.course_id, 1)
+    db.session.execute(
+        db.update(Enrollment)
+        .where(Enrollment.course_id == lesson.course_id)
+        .values(progress=_progress(Enrollment.completed_lessons, lessons))
+    )
+
+
+def lesson_deleted(lesson):
+    """Drop a lesson's completions and rescale its course's enrollments; call before deleting the lesson."""
+    lessons = lessons_changed(lesson.course_id, -1)
+    completed_it = Enrollment.student_id.in_(
+        db.select(LessonCompletion.student_id).where(LessonCompletion.lesson_id == lesson.id)
+    )
+    completed = Enrollment.completed_lessons - case((completed_it, 1), else_=0)
+    db.session.execute(
+        db.update(Enrollment)
+        .where(Enrollment.course_id == lesson.course_id)
+        .ordered_values(
+            (Enrollment.progress, _progress(completed, lessons)),
+            (Enrollment.completed_lessons, completed)
+        )
+    )
+    db.session.execute(db.delete(LessonCompletion).where(LessonCompletion.lesson_id == lesson.id))
+
+
+def reconcile_progress(executor=None):
+    """Recount completed lessons and progress of every enrollment from LessonCompletion and Lesson.
+
+    Returns the number of enrollments fixed. ``executor`` is the session (default)
+    or a connection, e.g. in a migration.
+    """
+    executor = executor or db.session
+    enrollment = Enrollment.__table__
+    completed = (
+        db.select(func.count(LessonCompletion.id))
+        .where(LessonCompletion.student_id == enrollment.c.student_id, LessonCompletion.course_id == enrollment.c.course_id)
+        .scalar_subquery()
+    )
+    lessons = db.select(func.count(Lesson.id)).where(Lesson.course_id == enrollment.c.course_id).scalar_subquery()
+    progress = case((lessons > 0, completed * 1.0 / lessons), else_=0.0)
+    return executor.execute(
+        enrollment.update()
+        .where((enrollment.c.completed_lessons != completed) | (enrollment.c.progress.is_(None)) | (enrollment.c.progress != progress))
+        .ordered_values((enrollment.c.progress, progress), (enrollment.c.completed_lessons, completed))
+    ).rowcount
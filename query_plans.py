@@ -0,0 +1,71 @@
+# query_plans.py
+
+import re
+from collections import namedtuple
+
+from sqlalchemy import text
+
+from extensions import db
+from models import Course, Enrollment, Lesson, Notice, Question, Quiz, QuizSubmission
+
+# The queries behind the busiest routes and the indexes their plans must use (any one of them)
+HOT_QUERIES = [
+    ('course roster (manage_students, counters)',
+     lambda: db.select(Enrollment.student_id).where(Enrollment.course_id == 1),
+     {'ix_enrollment_course_id'}),
+    ('answered questions (submit_quiz)',
+     lambda: db.select(QuizSubmission.question_id).where(QuizSubmission.student_id == 1, QuizSubmission.quiz_id == 1),
+     {'ix_quiz_submission_student_quiz_question'}),
+    ('answers of a submissions page (view_submissions)',
+     lambda: db.select(QuizSubmission).where(QuizSubmission.quiz_id == 1, QuizSubmission.student_id.in_([1, 2, 3])),
+     {'ix_quiz_submission_quiz_student', 'ix_quiz_submission_student_quiz_question'}),
+    ('instructor courses (instructor_dashboard)',
+     lambda: db.select(Course).where(Course.instructor_id == 1),
+     {'ix_course_instructor_id'}),
+    ('featured courses (index)',
+     lambda: db.select(Course).where(Course.is_featured.is_(True)).order_by(Course.title, Course.id).limit(21),
+     {'ix_course_featured_title'}),
+    ('course listing (manage_courses)',
+     lambda: db.select(Course).order_by(Course.title, Course.id).limit(21),
+     {'ix_course_title'}),
+    ('notices (view_notices)',
+     lambda: db.select(Notice).where(Notice.course_id.in_([1, 2, 3])).order_by(Notice.date_posted.desc(), Notice.id.desc()).limit(21),
+     {'ix_notice_date_posted', 'ix_notice_course'}),
+    ('new notices (notice stream)',
+     lambda: db.select(Notice.id).where(Notice.course_id.in_([1, 2, 3]), Notice.id > 1),
+     {'ix_notice_course'}),
+    ('course lessons (course_details)',
+     lambda: db.select(Lesson.id, Lesson.title).where(Lesson.course_id == 1),
+     {'ix_lesson_course_id'}),
+    ('lesson validators (catalog API)',
+     lambda: db.select(db.func.count(), db.func.max(Lesson.updated_at)).where(Lesson.course_id == 1),
+     {'ix_lesson_course_id'}),
+    ('course quizzes (course_details)',
+     lambda: db.select(Quiz).where(Quiz.course_id == 1),
+     {'ix_quiz_course_id'}),
+    ('answer key (take_quiz)',
+     lambda: db.select(Question.id, Question.correct_answer).where(Question.quiz_id == 1).order_by(Question.id),
+     {'ix_question_quiz_id'}),
+]
+
+PlanCheck = namedtuple('PlanCheck', ['name', 'ok', 'plan'])
+
+_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def explain(statement):
+    """Return the EXPLAIN QUERY PLAN detail lines of a statement (SQLite only)."""
+    sql = statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+
+def check_query_plans():
+    """EXPLAIN every hot query; a check passes if its plan uses one of the expected indexes
+    and does not scan a whole table."""
+    results = []
+    for name, build, indexes in HOT_QUERIES:
+        plan = explain(build())
+        uses_index = any(index in line for line in plan for index in indexes)
+        full_scan = any(_FULL_SCAN.match(line) for line in plan)
+        results.append(PlanCheck(name, uses_index and not full_scan, plan))
+    return results
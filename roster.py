@@ -0,0 +1,335 @@
+# roster.py
+
+import csv
+import io
+import json
+import os
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from counters import enrollments_added
+from extensions import db, insert_ignore
+from models import Course, Enrollment, Instructor, RoleEnum, Student, User
+
+# Same scheme as the register route
+PASSWORD_HASH_METHOD = 'pbkdf2:sha256'
+
+# Roles that may be imported; admins are created by hand
+IMPORTABLE_ROLES = {RoleEnum.STUDENT.value: RoleEnum.STUDENT, RoleEnum.INSTRUCTOR.value: RoleEnum.INSTRUCTOR}
+
+# Below this many passwords, starting worker processes costs more than it saves
+MIN_PARALLEL_HASHES = 64
+
+# A parsed input row; ``line`` is the line number in the source file
+ImportRow = namedtuple('ImportRow', ['line', 'username', 'password', 'role', 'course_ids'])
+RowError = namedtuple('RowError', ['line', 'username', 'message'])
+
+
+class ImportReport:
+    """Outcome of an import: counters plus one error per rejected row."""
+
+    def __init__(self):
+        self.created = 0
+        self.enrolled = 0
+        self.errors = []
+
+    def reject(self, line, username, message):
+        self.errors.append(RowError(line, username, message))
+
+    def to_dict(self):
+        return {
+            'created': self.created,
+            'enrolled': self.enrolled,
+            'errors': [error._asdict() for error in self.errors],
+        }
+
+
+def _course_ids(value):
+    """Course ids from a JSON list or a CSV cell like '3;7;12'."""
+    if value in (None, ''):
+        return []
+    if isinstance(value, (list, tuple)):
+        items = value
+    else:
+        items = str(value).replace(',', ';').split(';')
+    return sorted({int(item) for item in items if str(item).strip()})
+
+
+def _records(stream, fmt):
+    """Yield (line number, raw record) pairs of a CSV or JSONL stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'jsonl':
+        for number, line in enumerate(stream, start=1):
+            if line.strip():
+                yield number, line
+    else:
+        raise ValueError(f'Unknown import format {fmt!r}')
+
+
+def parse_rows(stream, fmt, report):
+    """Yield an ImportRow per CSV/JSONL record of a text stream; malformed records go to the report.
+
+    CSV needs a header with username, password and role, and may have a
+    courses column. JSONL records use the same keys, courses being a list.
+    """
+    for line, record in _records(stream, fmt):
+        try:
+            if fmt == 'jsonl':
+                record = json.loads(record)
+                if not isinstance(record, dict):
+                    raise ValueError('expected a JSON object')
+            username = str(record.get('username') or '').strip()
+            password = str(record.get('password') or '')
+            role = str(record.get('role') or '').strip().lower()
+            course_ids = _course_ids(record.get('courses'))
+        except ValueError as error:
+            report.reject(line, None, f'Malformed record: {error}')
+            continue
+
+        if not 3 <= len(username) <= 150:
+            report.reject(line, username, 'Username must be 3 to 150 characters.')
+        elif len(password) < 8:
+            report.reject(line, username, 'Password must be at least 8 characters.')
+        elif role not in IMPORTABLE_ROLES:
+            report.reject(line, username, f'Role must be one of {", ".join(IMPORTABLE_ROLES)}.')
+        elif course_ids and role != RoleEnum.STUDENT.value:
+            report.reject(line, username, 'Only students can be enrolled in courses.')
+        else:
+            yield ImportRow(line, username, password, IMPORTABLE_ROLES[role], course_ids)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _check_chunk(chunk, seen, known_courses, report):
+    """Drop rows whose username is taken or repeated, or whose courses don't exist."""
+    existing = set(db.session.execute(
+        db.select(User.username).where(User.username.in_([row.username for row in chunk]))
+    ).scalars())
+    accepted = []
+    for row in chunk:
+        missing = [course_id for course_id in row.course_ids if course_id not in known_courses]
+        if row.username in seen:
+            report.reject(row.line, row.username, f'Duplicate of line {seen[row.username]}.')
+        elif row.username in existing:
+            report.reject(row.line, row.username, 'That username is already taken.')
+        elif missing:
+            report.reject(row.line, row.username, f'Unknown course ids: {", ".join(map(str, missing))}.')
+        else:
+            seen[row.username] = row.line
+            accepted.append(row)
+    return accepted
+
+
+def _insert_chunk(chunk, hashes):
+    """Insert the users of a chunk with their profile and enrollment rows; returns the enrollment count."""
+    returned = db.session.execute(
+        db.insert(User).returning(User.id, User.username),
+        [{'username': row.username, 'password': password, 'role': row.role} for row, password in zip(chunk, hashes)]
+    ).all()
+    ids = {username: user_id for user_id, username in returned}
+
+    instructors = [{'id': ids[row.username]} for row in chunk if row.role == RoleEnum.INSTRUCTOR]
+    students = [{'id': ids[row.username]} for row in chunk if row.role == RoleEnum.STUDENT]
+    enrollments = [
+        {'student_id': ids[row.username], 'course_id': course_id, 'progress': 0.0}
+        for row in chunk for course_id in row.course_ids
+    ]
+    if instructors:
+        db.session.execute(db.insert(Instructor), instructors)
+    if students:
+        db.session.execute(db.insert(Student), students)
+    if enrollments:
+        db.session.execute(db.insert(Enrollment), enrollments)
+        enrollments_added((row['student_id'], row['course_id']) for row in enrollments)
+    return len(enrollments)
+
+
+def import_users(stream, fmt='csv', chunk_size=1000, workers=None):
+    """Create the users (and enrollments) listed in a CSV or JSONL text stream.
+
+    Passwords are hashed on a pool of ``workers`` processes (all CPUs by
+    default) and rows are inserted with executemany, committing once per
+    ``chunk_size`` rows. A chunk that fails to insert is rolled back and
+    reported without affecting the others. Returns an ImportReport.
+    """
+    report = ImportReport()
+    known_courses = set(db.session.execute(db.select(Course.id)).scalars())
+    seen = {}
+    hash_password = partial(generate_password_hash, method=PASSWORD_HASH_METHOD)
+    workers = workers or os.cpu_count() or 1
+    pool = None
+    try:
+        for chunk in _chunks(parse_rows(stream, fmt, report), chunk_size):
+            chunk = _check_chunk(chunk, seen, known_courses, report)
+            if not chunk:
+                continue
+            passwords = [row.password for row in chunk]
+            if len(passwords) >= MIN_PARALLEL_HASHES and workers > 1:
+                pool = pool or ProcessPoolExecutor(max_workers=workers)
+                hashes = list(pool.map(hash_password, passwords, chunksize=max(len(passwords) // (4 * workers), 1)))
+            else:
+                hashes = [hash_password(password) for password in passwords]
+
+            try:
+                report.enrolled += _insert_chunk(chunk, hashes)
+                db.session.commit()
+                report.created += len(chunk)
+            except IntegrityError:
+                # Another writer took a username meanwhile; nothing of this chunk was kept
+                db.session.rollback()
+                for row in chunk:
+                    report.reject(row.line, row.username, 'Conflicted with a concurrent change; import the row again.')
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    report.errors.sort(key=lambda error: error.line)
+    return report
+
+
+def import_upload(file_storage, chunk_size=1000, workers=None):
+    """Import from an uploaded .csv or .jsonl file."""
+    fmt = 'jsonl' if (file_storage.filename or '').lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+    stream = io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
+    return import_users(stream, fmt, chunk_size=chunk_size, workers=workers)
+
+
+# Bulk enrollment
+
+# A student to enroll; ``row`` is its position in the JSON list or its CSV line, ``student`` an id or a username
+EnrollRow = namedtuple('EnrollRow', ['row', 'student'])
+
+ENROLLED, ALREADY_ENROLLED = 'enrolled', 'already_enrolled'
+NOT_FOUND, DUPLICATE, INVALID = 'not_found', 'duplicate', 'invalid'
+
+
+class EnrollmentReport:
+    """Outcome of a bulk enrollment: one entry per requested student."""
+
+    def __init__(self):
+        self.outcomes = []
+        self.counts = Counter()
+        self.truncated = False
+
+    def record(self, row, status, student_id=None):
+        self.outcomes.append({'row': row.row, 'student': row.student, 'student_id': student_id, 'status': status})
+        self.counts[status] += 1
+
+    @property
+    def enrolled_ids(self):
+        return [outcome['student_id'] for outcome in self.outcomes if outcome['status'] == ENROLLED]
+
+    def to_dict(self):
+        return {
+            'enrolled': self.counts[ENROLLED],
+            'already_enrolled': self.counts[ALREADY_ENROLLED],
+            'rejected': self.counts[NOT_FOUND] + self.counts[DUPLICATE] + self.counts[INVALID],
+            'truncated': self.truncated,
+            'rows': self.outcomes,
+        }
+
+
+def _json_students(students, report):
+    """EnrollRows from a JSON list of student ids (numbers) and usernames (strings)."""
+    for number, value in enumerate(students, start=1):
+        if isinstance(value, str) and value.strip():
+            yield EnrollRow(number, value.strip())
+        elif isinstance(value, int) and not isinstance(value, bool):
+            yield EnrollRow(number, value)
+        else:
+            report.record(EnrollRow(number, value), INVALID)
+
+
+def _csv_students(stream, report):
+    """EnrollRows from a CSV text stream with a student_id or a username column."""
+    reader = csv.DictReader(stream)
+    if not {'student_id', 'username'} & set(reader.fieldnames or ()):
+        raise ValueError('The CSV needs a student_id or a username column.')
+    for record in reader:
+        student_id = (record.get('student_id') or '').strip()
+        username = (record.get('username') or '').strip()
+        if student_id.isdigit():
+            yield EnrollRow(reader.line_num, int(student_id))
+        elif username and not student_id:
+            yield EnrollRow(reader.line_num, username)
+        else:
+            report.record(EnrollRow(reader.line_num, student_id or username or None), INVALID)
+
+
+def _limit(rows, max_rows, report):
+    for number, row in enumerate(rows, start=1):
+        if max_rows and number > max_rows:
+            report.truncated = True
+            return
+        yield row
+
+
+def _student_ids(chunk):
+    """Map the ids and usernames of a chunk's rows to the ids of existing students."""
+    ids = {row.student for row in chunk if isinstance(row.student, int)}
+    usernames = {row.student for row in chunk if isinstance(row.student, str)}
+    found = {}
+    if ids:
+        found.update((student_id, student_id) for student_id in db.session.execute(
+            db.select(Student.id).where(Student.id.in_(ids))
+        ).scalars())
+    if usernames:
+        found.update(db.session.execute(
+            db.select(User.username, Student.id).join(Student, Student.id == User.id).where(User.username.in_(usernames))
+        ).all())
+    return found
+
+
+def enroll_students(course_id, source, fmt='json', chunk_size=1000, max_rows=None):
+    """Enroll the students listed in a JSON list or a CSV text stream in a course.
+
+    Each chunk of ``chunk_size`` rows is one transaction: a lookup of the
+    students, one INSERT that skips existing enrollments (so repeating a
+    request is harmless) and one counter update for the rows it inserted.
+    Rows past ``max_rows`` are left out and the report marked truncated.
+    Returns an EnrollmentReport.
+    """
+    report = EnrollmentReport()
+    rows = _json_students(source, report) if fmt == 'json' else _csv_students(source, report)
+    seen = set()
+    for chunk in _chunks(_limit(rows, max_rows, report), chunk_size):
+        found = _student_ids(chunk)
+        pending = {}  # student id -> row
+        for row in chunk:
+            student_id = found.get(row.student)
+            if student_id is None:
+                report.record(row, NOT_FOUND)
+            elif student_id in seen:
+                report.record(row, DUPLICATE, student_id)
+            else:
+                seen.add(student_id)
+                pending[student_id] = row
+
+        inserted = {student_id for student_id, in insert_ignore(
+            Enrollment,
+            [{'student_id': student_id, 'course_id': course_id, 'progress': 0.0} for student_id in pending],
+            returning=[Enrollment.student_id]
+        )}
+        enrollments_added((student_id, course_id) for student_id in inserted)
+        db.session.commit()
+        for student_id, row in pending.items():
+            report.record(row, ENROLLED if student_id in inserted else ALREADY_ENROLLED, student_id)
+
+    report.outcomes.sort(key=lambda outcome: outcome['row'])
+    return report
@@ -0,0 +1,146 @@
+# search.py
+
+import re
+from collections import namedtuple
+
+from markupsafe import Markup, escape
+from sqlalchemy import bindparam, text
+
+from extensions import db
+from models import Course, Lesson, Notice
+
+# FTS5 table, source model and indexed columns (title first, body second) per searchable kind
+SEARCH_INDEXES = {
+    'course': ('course_fts', Course, ('title', 'description')),
+    'lesson': ('lesson_fts', Lesson, ('title', 'content')),
+    'notice': ('notice_fts', Notice, ('title', 'content')),
+}
+
+# Notices belong to a course, or to everyone when they have none; those of a deleted course to no one
+_VISIBLE_NOTICES = 'course_id IS NULL OR course_id IN {courses}'
+
+# One ranked search hit; title and snippet are already escaped and highlighted
+SearchHit = namedtuple('SearchHit', ['kind', 'id', 'title', 'snippet'])
+
+# Control characters wrap the matches so user content can be escaped before adding <mark> tags
+_MARK_START, _MARK_END = '\x02', '\x03'
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def search_available(executor=None):
+    """Whether the database has full-text search: FTS5 is SQLite's, so elsewhere indexing is skipped and searches find nothing."""
+    executor = executor or db.session
+    bind = executor.get_bind() if hasattr(executor, 'get_bind') else executor
+    return bind.dialect.name == 'sqlite'
+
+
+def create_search_tables(executor=None):
+    """Create the FTS5 virtual tables if they don't exist.
+
+    ``executor`` is the session (default) or a connection, e.g. in a migration.
+    """
+    executor = executor or db.session
+    if not search_available(executor):
+        return
+    for table, _, columns in SEARCH_INDEXES.values():
+        executor.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({', '.join(columns)}, tokenize='unicode61')"
+        ))
+
+
+def index_entity(kind, entity):
+    """Insert or replace the search entry of a course, lesson or notice.
+
+    New entities must be flushed first so they have an id. The caller commits.
+    """
+    if not search_available():
+        return
+    table, _, columns = SEARCH_INDEXES[kind]
+    remove_entity(kind, entity.id)
+    db.session.execute(
+        text(f"INSERT INTO {table} (rowid, {', '.join(columns)}) VALUES (:id, :{', :'.join(columns)})"),
+        {'id': entity.id, **{column: getattr(entity, column) or '' for column in columns}}
+    )
+
+
+def remove_entity(kind, entity_id):
+    """Drop the search entry of a deleted course, lesson or notice."""
+    if not search_available():
+        return
+    table = SEARCH_INDEXES[kind][0]
+    db.session.execute(text(f"DELETE FROM {table} WHERE rowid = :id"), {'id': entity_id})
+
+
+def rebuild_search_index(executor=None):
+    """Repopulate every search table from its source table; returns the entries per kind. The caller commits.
+
+    ``executor`` is the session (default) or a connection, e.g. in a migration.
+    """
+    executor = executor or db.session
+    if not search_available(executor):
+        return {}
+    create_search_tables(executor)
+    counts = {}
+    for kind, (table, model, columns) in SEARCH_INDEXES.items():
+        source = model.__tablename__
+        where = ' WHERE ' + _VISIBLE_NOTICES.format(courses='(SELECT id FROM course)') if kind == 'notice' else ''
+        executor.execute(text(f"DELETE FROM {table}"))
+        executor.execute(text(
+            f"INSERT INTO {table} (rowid, {', '.join(columns)}) SELECT id, {', '.join(columns)} FROM {source}{where}"
+        ))
+        counts[kind] = executor.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+    return counts
+
+
+def build_match_query(query):
+    """Turn free text into a safe FTS5 query: every word must match, as a prefix."""
+    tokens = _TOKEN.findall(query or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _highlight(value):
+    """Escape indexed text and turn the match markers into <mark> tags."""
+    escaped = str(escape(value or ''))
+    return Markup(escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def search(query, kinds=None, page=1, per_page=20, notice_courses=None):
+    """Run a ranked search over the given kinds and return (hits, has_next).
+
+    ``notice_courses`` are the ids of the courses whose notices the searcher may
+    see, besides those without a course; None leaves notices unfiltered.
+    """
+    match = build_match_query(query)
+    if not match or not search_available():
+        return [], False
+
+    kinds = kinds or list(SEARCH_INDEXES)
+    filter_notices = notice_courses is not None and 'notice' in kinds
+    selects = []
+    for kind in kinds:
+        table = SEARCH_INDEXES[kind][0]
+        # Matches in titles weigh ten times more than matches in the body
+        selects.append(
+            f"SELECT '{kind}' AS kind, rowid AS id, "
+            f"highlight({table}, 0, :start, :end) AS title, "
+            f"snippet({table}, 1, :start, :end, '…', 16) AS snippet, "
+            f"bm25({table}, 10.0, 1.0) AS score "
+            f"FROM {table} WHERE {table} MATCH :match"
+        )
+        if kind == 'notice' and filter_notices:
+            selects[-1] += f" AND rowid IN (SELECT id FROM notice WHERE {_VISIBLE_NOTICES.format(courses=':notice_courses')})"
+    statement = text(' UNION ALL '.join(selects) + ' ORDER BY score LIMIT :limit OFFSET :offset')
+    parameters = {
+        'match': match,
+        'start': _MARK_START,
+        'end': _MARK_END,
+        'limit': per_page + 1,
+        'offset': (page - 1) * per_page,
+    }
+    if filter_notices:
+        statement = statement.bindparams(bindparam('notice_courses', expanding=True))
+        parameters['notice_courses'] = list(notice_courses)
+    rows = db.session.execute(statement, parameters).all()
+
+    hits = [SearchHit(row.kind, row.id, _highlight(row.title), _highlight(row.snippet)) for row in rows[:per_page]]
+    return hits, len(rows) > per_page
@@ -0,0 +1,111 @@
+# storage.py
+
+import hashlib
+import os
+import uuid
+
+from sqlalchemy import func
+
+from extensions import db, insert_ignore
+from models import Blob, CourseMaterial, Submission
+
+# Copy uploads to disk in 64 KB blocks
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+def blob_path(folder, sha256):
+    """Sharded location of a blob, e.g. <folder>/ab/cd/abcd...; keeps directories small."""
+    return os.path.join(folder, sha256[:2], sha256[2:4], sha256)
+
+
+def staging_folder(folder):
+    """Folder for files being written; on the same filesystem so moving a blob in is a rename."""
+    path = os.path.join(folder, 'incoming')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def add_file(folder, path, sha256):
+    """Move an already hashed file into the store and take a reference to its blob.
+
+    If the content is already stored the new copy is deleted instead. The
+    row is created and counted in SQL, so concurrent uploads of the same
+    content neither collide nor lose a reference. The caller commits.
+    """
+    target = blob_path(folder, sha256)
+    known = db.session.execute(db.select(Blob.sha256).where(Blob.sha256 == sha256)).scalar() is not None
+    if known and os.path.exists(target):
+        os.remove(path)
+    else:
+        # New content, or a known blob whose file went missing and is healed by this copy
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+    if not known:
+        insert_ignore(Blob, [{'sha256': sha256, 'size': os.path.getsize(target), 'ref_count': 0}])
+    db.session.execute(db.update(Blob).where(Blob.sha256 == sha256).values(ref_count=Blob.ref_count + 1))
+    return db.session.get(Blob, sha256, populate_existing=True)
+
+
+def add_stream(folder, stream):
+    """Store the content of a file-like object, hashing it as it is written to disk."""
+    temp_path = os.path.join(staging_folder(folder), uuid.uuid4().hex)
+    hasher = hashlib.sha256()
+    with open(temp_path, 'wb') as temp:
+        for block in iter(lambda: stream.read(COPY_BLOCK_SIZE), b''):
+            hasher.update(block)
+            temp.write(block)
+    return add_file(folder, temp_path, hasher.hexdigest())
+
+
+def release(sha256):
+    """Drop one reference to a blob; returns True if it is now unreferenced.
+
+    The file itself is removed by collect_garbage() once the transaction has
+    committed, so a rollback never leaves a row pointing at a deleted file.
+    """
+    if not sha256:
+        return False
+    db.session.execute(
+        db.update(Blob).where(Blob.sha256 == sha256, Blob.ref_count > 0).values(ref_count=Blob.ref_count - 1)
+    )
+    ref_count = db.session.execute(db.select(Blob.ref_count).where(Blob.sha256 == sha256)).scalar()
+    return ref_count == 0
+
+
+def collect_garbage(folder, sha256s=None):
+    """Delete unreferenced blobs (optionally only the given ones) and their files; returns how many.
+
+    Commits the removal of the rows before unlinking the files.
+    """
+    query = db.select(Blob.sha256).where(Blob.ref_count <= 0)
+    if sha256s is not None:
+        if not sha256s:
+            return 0
+        query = query.where(Blob.sha256.in_(list(sha256s)))
+    unreferenced = list(db.session.execute(query).scalars())
+    if not unreferenced:
+        return 0
+
+    db.session.execute(db.delete(Blob).where(Blob.sha256.in_(unreferenced), Blob.ref_count <= 0))
+    db.session.commit()
+
+    # Keep the files of blobs that were referenced again in the meantime
+    survivors = set(db.session.execute(db.select(Blob.sha256).where(Blob.sha256.in_(unreferenced))).scalars())
+    unreferenced = [sha256 for sha256 in unreferenced if sha256 not in survivors]
+    for sha256 in unreferenced:
+        try:
+            os.remove(blob_path(folder, sha256))
+        except FileNotFoundError:
+            pass
+    return len(unreferenced)
+
+
+def recount_references():
+    """Recompute every blob's ref_count from the materials and submissions using it. The caller commits."""
+    material_refs = (
+        db.select(func.count(CourseMaterial.id)).where(CourseMaterial.blob_sha256 == Blob.sha256).scalar_subquery()
+    )
+    submission_refs = (
+        db.select(func.count(Submission.id)).where(Submission.blob_sha256 == Blob.sha256).scalar_subquery()
+    )
+    db.session.execute(db.update(Blob).values(ref_count=material_refs + submission_refs))
@@ -0,0 +1,78 @@
+# tests/test_search.py
+"""Search only finds the notices of the searcher's courses, and those without a course.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from migrate import upgrade  # noqa: E402
+from models import Course, Enrollment, Instructor, Notice, RoleEnum, Student, User  # noqa: E402
+from search import rebuild_search_index  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'lms.db'}",
+        'CACHE_BACKEND': None,
+        'WTF_CSRF_ENABLED': False,
+        'TESTING': True,
+    })
+    with app.app_context():
+        db.create_all()
+        upgrade()
+        users = {}
+        for username, role in (('teacher', RoleEnum.INSTRUCTOR), ('enrolled', RoleEnum.STUDENT), ('outsider', RoleEnum.STUDENT)):
+            user = users[username] = User(username=username, password='-', role=role)
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Instructor(id=user.id) if role == RoleEnum.INSTRUCTOR else Student(id=user.id))
+        algebra = Course(title='Algebra', description='Equations', instructor_id=users['teacher'].id)
+        biology = Course(title='Biology', description='Cells', instructor_id=users['teacher'].id)
+        db.session.add_all([algebra, biology])
+        db.session.flush()
+        db.session.add(Enrollment(student_id=users['enrolled'].id, course_id=algebra.id))
+        db.session.add(Enrollment(student_id=users['outsider'].id, course_id=biology.id))
+        db.session.add_all([
+            Notice(title='Algebra exam moved', content='The exam is on Friday.', instructor_id=users['teacher'].id, course_id=algebra.id),
+            Notice(title='Exam week', content='No lectures during the exam week.', instructor_id=users['teacher'].id),
+        ])
+        rebuild_search_index()
+        db.session.commit()
+        app.user_ids = {username: user.id for username, user in users.items()}
+    return app
+
+
+def search_as(app, username, query):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(app.user_ids[username])
+        session['_fresh'] = True
+    response = client.get('/search', query_string={'q': query, 'type': 'notice'})
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+
+def test_students_find_the_notices_of_their_courses(app):
+    page = search_as(app, 'enrolled', 'exam')
+    assert 'Algebra <mark>exam</mark> moved' in page
+    assert '<mark>Exam</mark> week' in page
+
+
+def test_students_do_not_find_the_notices_of_other_courses(app):
+    page = search_as(app, 'outsider', 'exam')
+    assert 'Algebra' not in page
+    assert '<mark>Exam</mark> week' in page
+
+
+def test_instructors_find_the_notices_of_their_courses(app):
+    assert 'Algebra <mark>exam</mark> moved' in search_as(app, 'teacher', 'exam')
@@ -0,0 +1,157 @@
+# uploads.py
+
+import hashlib
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import UploadSession
+
+# Copy request bodies to disk in 64 KB blocks
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# Running SHA-256 of each open session and how many bytes it covers, so chunks are hashed once as
+# they arrive; a worker that did not see every chunk rehashes the file instead
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """Raised when a chunk or commit does not fit the upload session."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def partial_path(folder, session_id):
+    """Path of the file being assembled; keep it on the blob store's filesystem so commit is a rename."""
+    return os.path.join(folder, f'.{session_id}.part')
+
+
+def start_session(user_id, purpose, course_id, filename, total_size, folder, chunk_size):
+    """Open a new upload session and create its empty partial file. The caller commits."""
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        purpose=purpose,
+        course_id=course_id,
+        filename=filename,
+        total_size=total_size,
+        chunk_size=chunk_size
+    )
+    os.makedirs(folder, exist_ok=True)
+    open(partial_path(folder, session.id), 'wb').close()
+    with _hashers_lock:
+        _hashers[session.id] = (hashlib.sha256(), 0)
+    db.session.add(session)
+    return session
+
+
+def _hasher_for(session, path):
+    """Return the running hash of a session's received bytes.
+
+    It is rebuilt from disk when this process has none or has not hashed
+    exactly those bytes, e.g. after a restart or when other workers took chunks.
+    """
+    with _hashers_lock:
+        hasher, hashed = _hashers.get(session.id, (None, None))
+    if hasher is None or hashed != session.received_bytes:
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as partial:
+            remaining = session.received_bytes
+            while remaining:
+                block = partial.read(min(STREAM_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+    return hasher
+
+
+def expected_chunk_length(session, index):
+    """Return how many bytes chunk ``index`` must contain."""
+    return min(session.chunk_size, session.total_size - index * session.chunk_size)
+
+
+def write_chunk(session, index, stream, folder):
+    """Stream chunk ``index`` from ``stream`` into the partial file and hash it on the way.
+
+    Chunks must arrive in order; resending the last acknowledged chunks is a
+    no-op so clients can retry safely. The caller commits.
+    """
+    if index < session.next_chunk:
+        return False  # Already stored, e.g. a retry after a lost response
+    if index != session.next_chunk:
+        raise UploadError(f'Expected chunk {session.next_chunk}.', status=409)
+
+    expected = expected_chunk_length(session, index)
+    if expected <= 0:
+        raise UploadError('Chunk is beyond the end of the file.', status=416)
+
+    path = partial_path(folder, session.id)
+    if not os.path.exists(path):
+        raise UploadError('Upload session has expired.', status=410)
+
+    # Hash into a copy so an interrupted chunk leaves the running hash untouched
+    hasher = _hasher_for(session, path).copy()
+    written = 0
+    with open(path, 'r+b') as partial:
+        partial.seek(session.received_bytes)
+        partial.truncate()  # Drop leftovers of a previously interrupted chunk
+        while written <= expected:
+            block = stream.read(min(STREAM_BLOCK_SIZE, expected + 1 - written))
+            if not block:
+                break
+            partial.write(block)
+            hasher.update(block)
+            written += len(block)
+        if written != expected:
+            partial.truncate(session.received_bytes)
+            raise UploadError(f'Chunk {index} must be {expected} bytes, got {written}.')
+
+    with _hashers_lock:
+        _hashers[session.id] = (hasher, session.received_bytes + written)
+    session.received_bytes += written
+    session.next_chunk = index + 1
+    session.updated_at = datetime.utcnow()
+    return True
+
+
+def finish_session(session, folder, expected_sha256=None):
+    """Verify a complete upload and return the path of the assembled file and its hex SHA-256.
+
+    The caller moves the file into place, discards the session and commits.
+    """
+    if session.received_bytes != session.total_size:
+        raise UploadError(f'Upload incomplete: {session.received_bytes} of {session.total_size} bytes received.', status=409)
+
+    path = partial_path(folder, session.id)
+    digest = _hasher_for(session, path).hexdigest()
+    if expected_sha256 and expected_sha256.lower() != digest:
+        raise UploadError('Checksum mismatch.', status=422)
+
+    return path, digest
+
+
+def discard_session(session, folder):
+    """Forget a session and remove its partial file if it is still there. The caller commits."""
+    with _hashers_lock:
+        _hashers.pop(session.id, None)
+    try:
+        os.remove(partial_path(folder, session.id))
+    except FileNotFoundError:
+        pass
+    db.session.delete(session)
+
+
+def expire_sessions(max_idle, folder):
+    """Discard sessions idle for longer than ``max_idle`` seconds; returns how many."""
+    cutoff = datetime.utcnow() - timedelta(seconds=max_idle)
+    stale = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for session in stale:
+        discard_session(session, folder)
+    return len(stale)